@@ -0,0 +1,207 @@
+"""
+Read-only JSON API, version 1 (``/api/v1/``).
+
+Projects, skills and the caller's own contributor requests are listed in id
+order, ``limit`` at a time, with ``cursor`` taking the ``next_cursor`` of the
+previous page. ``fields=a,b`` returns only those fields (``id`` always comes
+along) and loads only the related rows they need.
+
+Every listing also returns a ``sync_token``. Passing it back as
+``changes_since`` returns just the rows created or changed since, plus the
+ids of those deleted, read from the ``Change`` log that SQLite triggers keep
+(migration 0018), and a new token to poll with next. A client lists once,
+keeping the token from the first page, and from then on only fetches deltas.
+"""
+from functools import wraps
+from operator import attrgetter
+
+from django.conf import settings
+from django.db.models import Max
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_safe
+
+from .models import Change, ContributorRequest, Project, RepoSnapshot, Skill
+from .pagination import InvalidCursor, decode_token, encode_token
+
+
+class ApiError(Exception):
+    """A bad query parameter, answered with a 400."""
+
+
+class Field:
+    def __init__(self, get, select=None, prefetch=None):
+        self.get = get
+        self.select = select
+        self.prefetch = prefetch
+
+
+def _attr(name):
+    return Field(attrgetter(name))
+
+
+def _snapshot(name):
+    def get(project):
+        try:
+            return getattr(project.snapshot, name)
+        except RepoSnapshot.DoesNotExist:  # not synced from GitHub yet
+            return None
+    return Field(get, select='snapshot')
+
+
+class Resource:
+    def __init__(self, kind, model, fields, default=None, owned=False):
+        self.kind = kind
+        self.model = model
+        self.fields = fields
+        self.default = default or tuple(fields)
+        # Only the caller's own rows, matched on Change.user_id
+        self.owned = owned
+
+    def queryset(self, user, names):
+        queryset = self.model.objects.all()
+        if self.owned:
+            queryset = queryset.filter(requester=user)
+        fields = [self.fields[name] for name in names]
+        selects = {f.select for f in fields if f.select}
+        prefetches = {f.prefetch for f in fields if f.prefetch}
+        if selects:
+            queryset = queryset.select_related(*selects)
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset
+
+    def serialize(self, obj, names):
+        return {name: self.fields[name].get(obj) for name in names}
+
+
+PROJECTS = Resource('project', Project, {
+    'id': _attr('id'),
+    'url': Field(lambda p: reverse('project_detail', args=[p.id])),
+    'owner': Field(lambda p: p.owner.username, select='owner'),
+    'repo_link': _attr('repo_link'),
+    'description': _attr('description'),
+    'desired_skills': Field(lambda p: sorted(s.id for s in p.desired_skills.all()), prefetch='desired_skills'),
+    'contributors_needed': _attr('contributors_needed'),
+    'like_count': _attr('like_count'),
+    'forks_count': _snapshot('forks_count'),
+    'default_branch': _snapshot('default_branch'),
+    'readme_preview': _snapshot('readme_preview'),
+    'readme_html': _snapshot('readme_html'),
+    'created_at': Field(lambda p: p.created_at.isoformat()),
+}, default=(
+    # readme_html can run to tens of kilobytes, so it is only sent when asked for
+    'id', 'url', 'owner', 'repo_link', 'description', 'desired_skills', 'contributors_needed',
+    'like_count', 'forks_count', 'default_branch', 'readme_preview', 'created_at',
+))
+
+SKILLS = Resource('skill', Skill, {
+    'id': _attr('id'),
+    'name': _attr('name'),
+})
+
+REQUESTS = Resource('request', ContributorRequest, {
+    'id': _attr('id'),
+    'project': _attr('project_id'),
+    'status': _attr('status'),
+    'created_at': Field(lambda r: r.created_at.isoformat()),
+}, owned=True)
+
+
+def api_view(view):
+    """Answer anonymous callers and bad parameters with JSON errors, not redirects or pages."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        try:
+            return view(request, *args, **kwargs)
+        except (ApiError, InvalidCursor) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return wrapper
+
+
+def _field_names(request, resource):
+    requested = request.GET.get('fields')
+    if not requested:
+        return resource.default
+    names = [name for name in dict.fromkeys(requested.split(',')) if name]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}")
+    return ('id', *(name for name in names if name != 'id'))
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit must be an integer')
+    return min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def _visible_changes(resource, user):
+    return Change.objects.filter(kind=resource.kind, user_id=user.id if resource.owned else None)
+
+
+def _listing(request, resource):
+    names = _field_names(request, resource)
+    limit = _limit(request)
+    if 'changes_since' in request.GET:
+        return _changes(request, resource, names, limit)
+
+    # Taken before the rows are read, so a write that races the listing is
+    # sent again by the next changes_since rather than missed
+    seq = Change.objects.aggregate(seq=Max('seq'))['seq'] or 0
+    # The first page is the one after id 0, so every page is the same
+    # primary key range search
+    cursor = request.GET.get('cursor')
+    after = decode_token(cursor, 'id') if cursor else 0
+    queryset = resource.queryset(request.user, names).filter(id__gt=after).order_by('id')
+    # One extra row tells us whether there is a next page
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_token('id', rows[-1].id)
+    return JsonResponse({
+        'data': [resource.serialize(row, names) for row in rows],
+        'next_cursor': next_cursor,
+        'sync_token': encode_token('seq', seq),
+    })
+
+
+def _changes(request, resource, names, limit):
+    """Rows written since the ``changes_since`` token, oldest write first."""
+    since = decode_token(request.GET['changes_since'], 'seq')
+    changes = list(_visible_changes(resource, request.user).filter(seq__gt=since).order_by('seq')[:limit + 1])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    live = resource.queryset(request.user, names).in_bulk(
+        [change.object_id for change in changes if not change.deleted],
+    )
+    return JsonResponse({
+        'data': [resource.serialize(live[c.object_id], names) for c in changes if c.object_id in live],
+        # Anything logged but gone by now was deleted too
+        'deleted': [c.object_id for c in changes if c.object_id not in live],
+        'has_more': has_more,
+        'sync_token': encode_token('seq', changes[-1].seq if changes else since),
+    })
+
+
+@api_view
+def projects(request):
+    return _listing(request, PROJECTS)
+
+
+@api_view
+def skills(request):
+    return _listing(request, SKILLS)
+
+
+@api_view
+def contributor_requests(request):
+    """The caller's own requests to join projects."""
+    return _listing(request, REQUESTS)
@@ -0,0 +1,255 @@
+"""
+Local proxy for GitHub avatars, resized and kept in an on-disk LRU cache.
+
+Templates link avatars with ``{% avatar_url %}`` to ``/avatar/<username>/<size>``
+rather than ``https://github.com/<username>.png``, which redirects and then
+downloads the full-size image to show it at 32px. The first request for a size
+asks GitHub for that size (``?size=``), which is all the resizing there is by
+default. Pillow is an optional extra the project doesn't require: where it is
+installed, the image is also re-encoded to exactly that size as WebP and PNG.
+
+Files live in ``AVATAR_CACHE_DIR``. A file's mtime is when it was fetched and
+its atime when it was last served: entries are fetched again once older than
+``AVATAR_MAX_AGE``, and the least recently served go first when the directory
+grows past ``AVATAR_CACHE_MAX_BYTES``. Async views read fresh files inline
+(``aload``); only fetches from GitHub go to a small thread pool of their own,
+so a page full of new avatars can't hold up other GitHub calls.
+"""
+import asyncio
+import contextvars
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.urls import reverse
+
+from . import github, metrics
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow is optional
+    Image = features = None
+
+logger = logging.getLogger(__name__)
+
+# Only these sizes are fetched and stored, so the cache can't be filled with
+# one copy per pixel width. Templates ask for 1x and 2x of the sizes they show.
+SIZES = (32, 40, 48, 64, 80, 96, 128, 210, 420)
+USERNAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9-]{0,38}$')
+# Recording a read would otherwise cost a write per request
+TOUCH_INTERVAL = 3600
+EVICT_TO = 0.9  # of AVATAR_CACHE_MAX_BYTES, so a full cache doesn't evict on every store
+SNIFF = ((b'\x89PNG', 'image/png'), (b'\xff\xd8', 'image/jpeg'), (b'GIF8', 'image/gif'), (b'RIFF', 'image/webp'))
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.AVATAR_FETCH_WORKERS,
+    thread_name_prefix='avatar-fetch',
+)
+# Per cache directory: [bytes as of the last scan plus our writes, bytes we wrote since the scan]
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+class AvatarNotFound(Exception):
+    """GitHub has no avatar for this username and none is cached."""
+
+
+class Avatar:
+    def __init__(self, content):
+        self.content = content
+        # Sniffed rather than taken from the extension: an image Pillow
+        # couldn't decode is stored as GitHub sent it
+        self.content_type = next(
+            (kind for magic, kind in SNIFF if content.startswith(magic)), 'application/octet-stream',
+        )
+        self.etag = '"{}"'.format(hashlib.sha256(content).hexdigest()[:32])
+
+
+def fit(size):
+    """The smallest stored size at least ``size`` pixels wide."""
+    return next((s for s in SIZES if s >= int(size)), SIZES[-1])
+
+
+def avatar_url(username, size):
+    return reverse('avatar', args=[username.lower(), fit(size)])
+
+
+def _encodings():
+    """File extensions stored per avatar and size, preferred first."""
+    if Image is None:
+        return ('img',)
+    return ('webp', 'png') if features.check('webp') else ('png',)
+
+
+def _extension(webp):
+    encodings = _encodings()
+    return encodings[0] if webp else encodings[-1]
+
+
+def _path(username, size, extension):
+    return os.path.join(settings.AVATAR_CACHE_DIR, f'{username.lower()}_{size}.{extension}')
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def cached(username, size, webp=False):
+    """
+    Return ``username``'s ``Avatar`` at ``size`` from disk, or None if it has
+    to be fetched first. Never waits on the network.
+    """
+    path = _path(username, size, _extension(webp))
+    now = time.time()
+    try:
+        stat = os.stat(path)
+        if now - stat.st_mtime > settings.AVATAR_MAX_AGE:
+            return None
+        content = _read(path)
+    except FileNotFoundError:  # never fetched, or evicted since
+        return None
+    metrics.record_cache('avatar', 'hit')
+    if now - stat.st_atime > TOUCH_INTERVAL:
+        try:
+            os.utime(path, (now, stat.st_mtime))
+        except FileNotFoundError:
+            pass
+    return Avatar(content)
+
+
+def load(username, size, webp=False):
+    """
+    Return ``username``'s ``Avatar`` at ``size``, as WebP if ``webp`` and
+    Pillow can write it, fetching it from GitHub if need be.
+
+    Raises ``AvatarNotFound``, or ``requests.RequestException`` when GitHub
+    can't be reached and nothing is cached. A stale file is served when a
+    refresh fails.
+    """
+    avatar = cached(username, size, webp)
+    if avatar is not None:
+        return avatar
+    extension = _extension(webp)
+    try:
+        stored = _refresh(username, size)
+    except (AvatarNotFound, requests.RequestException) as e:
+        try:
+            content = _read(_path(username, size, extension))
+        except FileNotFoundError:
+            raise e from None
+        logger.warning('Could not refresh avatar of %s, serving the cached one', username, exc_info=True)
+        metrics.record_cache('avatar', 'stale')
+        return Avatar(content)
+    metrics.record_cache('avatar', 'miss')
+    # Served from memory: the file may already have been evicted again
+    return Avatar(stored[extension])
+
+
+async def aload(username, size, webp=False):
+    """``load`` for async views: files on disk are read inline, fetches run on the avatar pool."""
+    avatar = cached(username, size, webp)
+    if avatar is not None:
+        return avatar
+    # In a copy of this context, so the fetch reports to the request's metrics
+    future = _executor.submit(contextvars.copy_context().run, load, username, size, webp)
+    return await asyncio.wrap_future(future)
+
+
+def _refresh(username, size):
+    """Fetch the avatar from GitHub and store it; return the bytes stored per extension."""
+    url = f"{settings.GITHUB_AVATAR_URL}/{username}.png?size={size}"
+    with metrics.outbound(urlsplit(url).netloc):
+        response = github.client.session.get(url, timeout=github.client.timeout)
+    if response.status_code == 404:
+        raise AvatarNotFound(username)
+    response.raise_for_status()
+
+    os.makedirs(settings.AVATAR_CACHE_DIR, exist_ok=True)
+    encodings = _encodings()
+    stored = dict.fromkeys(encodings, response.content)
+    if Image is not None:
+        try:
+            image = Image.open(io.BytesIO(response.content)).convert('RGBA')
+            if image.size != (size, size):
+                image = image.resize((size, size), Image.LANCZOS)
+            for extension in encodings:
+                out = io.BytesIO()
+                image.save(out, format=extension.upper(), **({'quality': 85} if extension == 'webp' else {'optimize': True}))
+                stored[extension] = out.getvalue()
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Kept as GitHub sent it; the content type is sniffed when served
+            logger.warning('Could not re-encode the avatar of %s', username, exc_info=True)
+            stored = dict.fromkeys(encodings, response.content)
+    for extension, content in stored.items():
+        _write(_path(username, size, extension), content)
+    _account(sum(map(len, stored.values())))
+    return stored
+
+
+def _write(path, content):
+    # Written aside and renamed into place, so readers never see half a file
+    fd, tmp = tempfile.mkstemp(dir=settings.AVATAR_CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _account(written):
+    """
+    Count ``written`` new bytes, and list the directory only when it may
+    have outgrown ``AVATAR_CACHE_MAX_BYTES``.
+
+    Other processes' writes are only seen by a scan, so one also runs after
+    this process has written what eviction frees (the last tenth of the cap)
+    since its previous scan.
+    """
+    cap = settings.AVATAR_CACHE_MAX_BYTES
+    with _usage_lock:
+        usage = _usage.get(settings.AVATAR_CACHE_DIR)
+        if usage is not None:
+            usage[0] += written
+            usage[1] += written
+            if usage[0] <= cap and usage[1] <= cap * (1 - EVICT_TO):
+                return
+    total = _evict()
+    with _usage_lock:
+        _usage[settings.AVATAR_CACHE_DIR] = [total, 0]
+
+
+def _evict():
+    """Drop the least recently served files if the directory is over the cap; return its size after."""
+    entries = []
+    with os.scandir(settings.AVATAR_CACHE_DIR) as scan:
+        for entry in scan:
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another process
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    if total <= settings.AVATAR_CACHE_MAX_BYTES:
+        return total
+    for _, size, path in sorted(entries):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass  # evicted by another process
+        total -= size
+        if total <= settings.AVATAR_CACHE_MAX_BYTES * EVICT_TO:
+            break
+    return total
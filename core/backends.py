@@ -0,0 +1,12 @@
+from asgiref.sync import sync_to_async
+from social_core.backends import github
+
+
+class GithubOAuth2(github.GithubOAuth2):
+    """
+    social-core's GitHub backend, plus the ``aget_user`` that Django's
+    ``request.auser()`` (and so ``login_required`` on async views) calls.
+    """
+
+    async def aget_user(self, user_id):
+        return await sync_to_async(self.get_user)(user_id)
@@ -0,0 +1,176 @@
+"""
+Tag-aware caching, so entries can live long and still change immediately.
+
+An entry is stored together with the versions of the tags it was built from
+(``feed``, ``project:<id>``, ``user:<id>``). Reading it checks those versions
+in one query and treats any mismatch as a miss. Signal handlers in
+``core.signals`` bump just the tags a change touches, so liking one project
+invalidates the pages showing that project and nothing else.
+
+The entries live in the default cache, but the versions live in the
+database (``CacheTag``): the cache may be per process, and a bump made by
+another worker, ``sync_github`` or ``run_jobs`` has to reach them all. A bump
+is part of the writer's transaction, so it becomes visible together with the
+rows it is about.
+
+``get_or_build`` also guards rebuilds against stampedes. An entry past its
+soft TTL is still served while one background thread refreshes it, and when
+tags change or the entry is missing only the request holding the rebuild lock
+does the work; the rest serve the previous value or wait for the new one.
+How each lookup went is counted per cache name, see ``stats``.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.db import connection
+
+from . import metrics
+from .models import CacheTag
+
+logger = logging.getLogger(__name__)
+
+FEED = 'feed'
+# Bumped along with every other tag, for pages showing too much to list tags for
+ANY = 'any'
+SOFT_TTL = 3600
+HARD_TTL = 24 * 3600
+LOCK_TIMEOUT = 30  # a rebuild lock outliving a crashed holder expires after this
+WAIT_TIMEOUT = 5  # how long a request waits for another's rebuild before doing its own
+WAIT_STEP = 0.05
+OUTCOMES = ('hit', 'stale', 'miss', 'wait', 'refresh', 'error')
+
+_refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
+
+
+def project_tag(project_id):
+    return f'project:{project_id}'
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def _fresh_version():
+    # Bumps move a version to at least the clock, not just up by one. A bump
+    # whose transaction rolled back, or a row lost with a restored backup,
+    # can then never be reissued as a number an entry was already built under.
+    return time.time_ns() // 1000
+
+
+def versions(tags):
+    """Return the current version of each tag; tags never bumped are at 0."""
+    tags = list(tags)
+    found = dict(CacheTag.objects.filter(name__in=tags).values_list('name', 'version'))
+    return {tag: found.get(tag, 0) for tag in tags}
+
+
+def _bump(tags):
+    table = CacheTag._meta.db_table
+    with connection.cursor() as cursor:
+        # Sorted, so concurrent bumps of overlapping tags lock rows in one order
+        cursor.executemany(
+            f'INSERT INTO {table} (name, version) VALUES (%s, %s) '
+            f'ON CONFLICT (name) DO UPDATE SET version = CASE WHEN excluded.version > {table}.version '
+            f'THEN excluded.version ELSE {table}.version + 1 END',
+            [(tag, _fresh_version()) for tag in sorted(tags)],
+        )
+
+
+def invalidate(*tags):
+    """Bump ``tags``, and ``ANY``, for every process at once."""
+    _bump(frozenset(tags) | {ANY})
+
+
+def _count(name, outcome):
+    metrics.record_cache(name, outcome)
+    key = f'cache_stats:{name}:{outcome}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def stats(name):
+    """Return how many lookups of cache ``name`` ended in each outcome.
+
+    ``stale`` counts previous values served while a rebuild was due; compare
+    it with ``hit`` to see how often readers got out-of-date data.
+    """
+    counts = cache.get_many([f'cache_stats:{name}:{outcome}' for outcome in OUTCOMES])
+    return {outcome: counts.get(f'cache_stats:{name}:{outcome}', 0) for outcome in OUTCOMES}
+
+
+def _store(key, build, hard_ttl, soft_ttl):
+    value, tag_versions = build()
+    cache.set(key, {'value': value, 'tags': tag_versions, 'fresh_until': time.time() + soft_ttl}, hard_ttl)
+    return value
+
+
+def _refresh(key, build, hard_ttl, soft_ttl, name):
+    try:
+        _store(key, build, hard_ttl, soft_ttl)
+        _count(name, 'refresh')
+    except Exception:
+        logger.exception('Background refresh of %s failed', key)
+        _count(name, 'error')
+    finally:
+        cache.delete(f'{key}:lock')
+
+
+def _refresh_in_thread(*args):
+    try:
+        _refresh(*args)
+    finally:
+        connection.close()
+
+
+def get_or_build(key, build, name=None, soft_ttl=SOFT_TTL, hard_ttl=HARD_TTL):
+    """Return the value cached under ``key``, rebuilding it at most once at a time.
+
+    ``build()`` returns ``(value, tag_versions)``, where ``tag_versions`` comes
+    from ``versions()`` called *before* the rows were read, so a change made
+    mid-build leaves the entry already out of date instead of stuck stale.
+    """
+    name = name or key
+    lock_key = f'{key}:lock'
+    entry = cache.get(key)
+    if entry is not None:
+        current = versions(entry['tags']) == entry['tags']
+        if current and entry['fresh_until'] > time.time():
+            _count(name, 'hit')
+            return entry['value']
+        if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            # Someone else is already rebuilding
+            _count(name, 'stale')
+            return entry['value']
+        if current:
+            # Only the soft TTL ran out: refresh behind this request
+            _count(name, 'stale')
+            _refresher.submit(_refresh_in_thread, key, build, hard_ttl, soft_ttl, name)
+            return entry['value']
+        # Tags changed, so this request waits for the rebuild it triggered
+        _count(name, 'miss')
+        try:
+            return _store(key, build, hard_ttl, soft_ttl)
+        finally:
+            cache.delete(lock_key)
+
+    # Nothing to fall back on: one request builds, the rest wait for it
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    while not locked and time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(key)
+        if entry is not None:
+            _count(name, 'wait')
+            return entry['value']
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    _count(name, 'miss')
+    try:
+        return _store(key, build, hard_ttl, soft_ttl)
+    finally:
+        if locked:
+            cache.delete(lock_key)
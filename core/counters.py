@@ -0,0 +1,100 @@
+"""
+Denormalized like counters.
+
+``Project.like_count`` and ``Profile.reputation`` (likes across all of a
+user's projects) are adjusted with F-expressions whenever likes change, so
+reading them never needs a COUNT. ``reconcile()`` recomputes both in bulk for
+the cases signals can't see, such as likes cascaded away with a deleted user.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+
+from . import cache_tags
+from .models import Profile, Project
+
+Like = Project.likes.through
+
+
+def adjust_likes(project_ids, delta):
+    """Add ``delta`` to the like count of each project and to its owner's reputation."""
+    if not project_ids or not delta:
+        return
+    Project.objects.filter(pk__in=project_ids).update(like_count=_plus('like_count', delta))
+    owners = Counter(Project.objects.filter(pk__in=project_ids).values_list('owner_id', flat=True))
+    for owner_id, projects in owners.items():
+        adjust_reputation(owner_id, delta * projects)
+
+
+def toggle_like(project_id, user_id):
+    """
+    Like ``project_id`` for ``user_id``, or unlike it if already liked, and
+    return ``(liked, like_count)``.
+
+    One conditional delete or insert plus the counter updates, in a single
+    transaction. The rows are written directly, bypassing the m2m signals, so
+    the count is adjusted here. Raises ``Project.DoesNotExist`` for an unknown
+    project.
+    """
+    with transaction.atomic():
+        if Like.objects.filter(project_id=project_id, user_id=user_id).delete()[0]:
+            liked, delta = False, -1
+        else:
+            try:
+                with transaction.atomic():
+                    Like.objects.create(project_id=project_id, user_id=user_id)
+                liked, delta = True, 1
+            except IntegrityError:
+                # A concurrent click inserted it first and counted it
+                liked, delta = True, 0
+        if delta:
+            Project.objects.filter(pk=project_id).update(like_count=_plus('like_count', delta))
+        row = Project.objects.filter(pk=project_id).values_list('like_count', 'owner_id').first()
+        if row is None:
+            raise Project.DoesNotExist(project_id)
+        like_count, owner_id = row
+        if delta:
+            adjust_reputation(owner_id, delta)
+    return liked, like_count
+
+
+def adjust_reputation(user_id, delta):
+    Profile.objects.filter(user_id=user_id).update(reputation=_plus('reputation', delta))
+
+
+def _plus(field, delta):
+    # Clamp at zero: a drifted counter must not trip the column's >= 0 check
+    return F(field) + delta if delta > 0 else Greatest(F(field) + delta, 0)
+
+
+def actual_like_count():
+    return Coalesce(Subquery(
+        Like.objects.filter(project_id=OuterRef('pk'))
+        .values('project_id').annotate(total=Count('*')).values('total')
+    ), 0)
+
+
+def actual_reputation():
+    return Coalesce(Subquery(
+        Project.objects.filter(owner_id=OuterRef('user_id'))
+        .values('owner_id').annotate(total=Sum('like_count')).values('total')
+    ), 0)
+
+
+def reconcile():
+    """Repair drifted counters; returns ``(projects fixed, profiles fixed)``."""
+    drifted_projects = Project.objects.exclude(like_count=actual_like_count())
+    drifted_profiles = Profile.objects.exclude(reputation=actual_reputation())
+    with transaction.atomic():
+        project_ids = list(drifted_projects.values_list('pk', flat=True))
+        projects = drifted_projects.update(like_count=actual_like_count())
+        user_ids = list(drifted_profiles.values_list('user_id', flat=True))
+        profiles = drifted_profiles.update(reputation=actual_reputation())
+        # Bulk updates send no signals
+        if project_ids or user_ids:
+            cache_tags.invalidate(
+                *map(cache_tags.project_tag, project_ids), *map(cache_tags.user_tag, user_ids),
+            )
+    return projects, profiles
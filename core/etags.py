@@ -0,0 +1,45 @@
+"""
+ETags for conditional GETs of the home and project pages.
+
+They are built from cache tag versions (see ``core.cache_tags``), which the
+signal handlers already bump whenever something a page shows changes, so a
+matching ``If-None-Match`` gets a 304 before the view does any work. The
+versions are read from the database, so a change made by another worker or
+by ``sync_github`` changes the ETag in every process. Used with Django's
+``condition`` decorator.
+"""
+import hashlib
+
+from django.contrib import messages
+from django.middleware.csrf import get_token
+
+from . import cache_tags
+
+
+def _etag(request, *versions):
+    # A page with messages waiting has to render, or they'd never be shown
+    if len(messages.get_messages(request)):
+        return None
+    # The CSRF secret is part of it so a rotated secret can't revive a page
+    # holding a token from before the rotation. get_token() creates it now if
+    # this is the first visit, rather than during the render.
+    get_token(request)
+    key = ':'.join(map(str, (request.user.pk, request.META['CSRF_COOKIE'], *versions)))
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def home(request):
+    """
+    The home page can show any project as a skill match, so it changes
+    whenever anything does.
+    """
+    return _etag(request, cache_tags.versions([cache_tags.ANY])[cache_tags.ANY])
+
+
+def project(request, project_id):
+    """
+    The project page shows nothing of its owner's profile, so only the
+    project's own tag: one indexed read of its version.
+    """
+    tag = cache_tags.project_tag(project_id)
+    return _etag(request, cache_tags.versions([tag])[tag])
@@ -0,0 +1,212 @@
+"""
+Assembly of the home feed.
+
+Everything a page of project cards needs is loaded in a fixed number of
+queries, however many projects are on the page: one for the page's keys,
+one for the projects with their owner, owner profile and GitHub snapshot
+joined in, one prefetch for desired skills, and one windowed query for the
+first pending requesters of every project. Rendered cards are cached per
+project (see ``render_cards``).
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+from . import avatars, cache_tags, metrics
+from .models import ContributorRequest, Profile, Project
+from .pagination import keyset_page
+from .skills import skill_index
+
+REQUESTERS_PER_PROJECT = 5
+
+
+def feed_queryset():
+    return (
+        Project.objects
+        .select_related('owner__profile', 'snapshot')
+        .prefetch_related('desired_skills')
+    )
+
+
+def pending_requesters(project_ids, limit=REQUESTERS_PER_PROJECT):
+    """Map each project id to its first ``limit`` pending requesters, in one query."""
+    ranked = (
+        ContributorRequest.objects
+        .filter(project_id__in=project_ids, status='pending')
+        .annotate(rank=Window(RowNumber(), partition_by=F('project_id'), order_by=F('id').asc()))
+        .filter(rank__lte=limit)
+        .order_by('project_id', 'rank')
+        .values_list('project_id', 'requester__username')
+    )
+    project_requests = defaultdict(list)
+    for project_id, username in ranked:
+        project_requests[project_id].append({
+            'username': username,
+            'avatar': avatars.avatar_url(username, 32),
+        })
+    return dict(project_requests)
+
+
+def assemble(projects):
+    """
+    Fill in GitHub snapshot data and payment links for projects loaded with
+    ``feed_queryset()``, and return their pending requesters by project id.
+    """
+    for project in projects:
+        # GitHub data comes from the snapshot kept warm by `manage.py sync_github`
+        snapshot = getattr(project, 'snapshot', None)
+        project.github_pending = snapshot is None or snapshot.fetched_at is None
+        project.forks_count = snapshot.forks_count if snapshot else None
+        project.readme_html = snapshot.readme_html if snapshot else None
+        project.readme_preview = snapshot.readme_preview if snapshot else None
+
+        # Payment links are only shown when the project opted in
+        profile = getattr(project.owner, 'profile', None)
+        project.buy_me_a_coffee = profile.buy_me_a_coffee if profile and project.buy_me_a_coffee else None
+        project.patreon = profile.patreon if profile and project.patreon else None
+        project.paypal = profile.paypal if profile and project.paypal else None
+    return pending_requesters([p.id for p in projects])
+
+
+def card_tags(projects):
+    """Cache tags for a set of cards: each project and each owner's profile."""
+    return (
+        [cache_tags.project_tag(p.id) for p in projects]
+        + [cache_tags.user_tag(p.owner_id) for p in projects]
+    )
+
+
+def stamp_card_versions(projects, tag_versions):
+    """Record on each project the tag versions its card was loaded under."""
+    for project in projects:
+        project.card_version = '{}-{}'.format(
+            tag_versions[cache_tags.project_tag(project.id)],
+            tag_versions[cache_tags.user_tag(project.owner_id)],
+        )
+
+
+def _load_page(cursor):
+    # Tag versions are read before the rows they cover, so a change landing
+    # mid-load leaves what we cache already out of date rather than stuck stale.
+    keys, next_cursor = keyset_page(Project.objects.only('id', 'created_at', 'owner_id'), cursor, settings.FEED_PAGE_SIZE)
+    seen = cache_tags.versions(card_tags(keys))
+    by_id = feed_queryset().in_bulk([p.id for p in keys])
+    projects = [by_id[p.id] for p in keys if p.id in by_id]
+    stamp_card_versions(projects, seen)
+    page = {
+        'projects': projects,
+        'project_requests': assemble(projects),
+        'next_cursor': next_cursor,
+    }
+    return page, seen
+
+
+def feed_page(cursor=None):
+    """Return one keyset-paginated page of the project feed."""
+    if cursor:
+        return _load_page(cursor)[0]
+
+    # The first page is cached until a project on it (or a new one) changes
+    def build():
+        seen = cache_tags.versions([cache_tags.FEED])
+        page, card_versions = _load_page(None)
+        return page, {**seen, **card_versions}
+
+    return cache_tags.get_or_build(
+        'home_projects', build,
+        soft_ttl=settings.FEED_CACHE_SOFT_TTL, hard_ttl=settings.FEED_CACHE_HARD_TTL,
+    )
+
+
+def matched_projects(user):
+    """
+    Return ``(projects, project_requests)`` for the projects sharing the most
+    skills with ``user``, best match first.
+    """
+    skill_ids = sorted(Profile.skills.through.objects.filter(profile__user=user).values_list('skill_id', flat=True))
+    if not skill_ids:
+        return [], {}
+    ranked = skill_index.match(skill_ids, limit=settings.FEED_PAGE_SIZE)
+
+    # The key changes with the index version, so new or re-tagged projects
+    # show up at once; the user's tag covers edits to their own skills.
+    cache_key_matched = f'matched_projects_{user.id}_{skill_index.version}'
+
+    def build():
+        overlap = dict(ranked)
+        seen = cache_tags.versions(
+            [cache_tags.user_tag(user.id)] + [cache_tags.project_tag(project_id) for project_id in overlap]
+        )
+        projects = sorted(
+            feed_queryset().filter(id__in=overlap),
+            key=lambda p: (overlap[p.id], p.id), reverse=True,
+        )
+        for project in projects:
+            project.skill_overlap = overlap[project.id]
+        seen = {**cache_tags.versions(card_tags(projects)), **seen}
+        stamp_card_versions(projects, seen)
+        return (projects, assemble(projects)), seen
+
+    return cache_tags.get_or_build(
+        cache_key_matched, build, name='matched_projects',
+        soft_ttl=settings.FEED_CACHE_SOFT_TTL, hard_ttl=settings.FEED_CACHE_HARD_TTL,
+    )
+
+
+def render_cards(projects, project_requests):
+    """
+    Attach each card's HTML to its project as ``card_html``.
+
+    Cards are cached under the versions stamped by ``stamp_card_versions``, so
+    only cards whose project, likes, requests, snapshot or owner changed are
+    rendered again. The cached HTML holds nothing specific to the viewer;
+    ``project_card.html`` adds the liked state and matching badge around it.
+    """
+    keys = {project.id: f'project_card:{project.id}:{project.card_version}' for project in projects}
+    cached = cache.get_many(list(set(keys.values())))
+    rendered = {}
+    for project in projects:
+        key = keys[project.id]
+        html = cached.get(key) or rendered.get(key)
+        if html is None:
+            html = rendered[key] = render_to_string('project_card_body.html', {
+                'project': project,
+                'requests': project_requests.get(project.id, []),
+            })
+        project.card_html = mark_safe(html)
+    metrics.record_cache('project_card', 'hit', len(cached))
+    metrics.record_cache('project_card', 'miss', len(rendered))
+    if rendered:
+        cache.set_many(rendered, settings.FEED_CACHE_HARD_TTL)
+
+
+def liked_ids(user, projects):
+    """Ids of the given projects that ``user`` has liked, in one query."""
+    return set(
+        Project.likes.through.objects
+        .filter(user=user, project_id__in=[p.id for p in projects])
+        .values_list('project_id', flat=True)
+    )
+
+
+def project_json(project, project_requests):
+    return {
+        'id': project.id,
+        'url': reverse('project_detail', args=[project.id]),
+        'owner': project.owner.username,
+        'repo_link': project.repo_link,
+        'description': project.description,
+        'desired_skills': [skill.name for skill in project.desired_skills.all()],
+        'contributors_needed': project.contributors_needed,
+        'like_count': project.like_count,
+        'forks_count': project.forks_count,
+        'readme_html': project.readme_html,
+        'requests': project_requests.get(project.id, []),
+        'created_at': project.created_at.isoformat(),
+    }
@@ -0,0 +1,411 @@
+import asyncio
+import base64
+import contextvars
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+ETAG_TTL = 7 * 24 * 3600  # Validators stay useful long after the data changes
+README_GIST_TTL = 24 * 3600
+
+
+class GitHubError(Exception):
+    """GitHub could not be reached and there was nothing cached to fall back on."""
+
+
+class GitHubResponse:
+    """The parts of a GitHub response callers need, whether fresh or served from the ETag cache."""
+
+    def __init__(self, status_code, content, headers, stale=False):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.stale = stale
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content) if self.content else {}
+
+
+class GitHubClient:
+    """
+    Shared GitHub client.
+
+    One pooled session is reused across threads. GET responses with an ETag
+    are stored in the cache and revalidated with ``If-None-Match`` (a 304
+    doesn't count against the quota). When ``X-RateLimit-Remaining`` drops to
+    the reserve, or after repeated failures trip the circuit breaker, GETs are
+    answered from the cache (marked ``stale``) without touching the network.
+    """
+
+    def __init__(self, token=None, timeout=None, pool_size=None, rate_limit_reserve=None,
+                 failure_threshold=None, cooldown=None):
+        self.token = token if token is not None else getattr(settings, 'GITHUB_TOKEN', None)
+        self.timeout = timeout or getattr(settings, 'GITHUB_TIMEOUT', 5)
+        self.rate_limit_reserve = (
+            rate_limit_reserve if rate_limit_reserve is not None
+            else getattr(settings, 'GITHUB_RATE_LIMIT_RESERVE', 50)
+        )
+        self.failure_threshold = failure_threshold or getattr(settings, 'GITHUB_CIRCUIT_THRESHOLD', 5)
+        self.cooldown = cooldown or getattr(settings, 'GITHUB_CIRCUIT_COOLDOWN', 30)
+
+        pool_size = pool_size or getattr(settings, 'GITHUB_POOL_SIZE', 16)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._budgets = {}   # (host, token) -> (remaining, reset epoch)
+        self._circuits = {}  # host -> (consecutive failures, opened at)
+
+    def get(self, url, token=None, headers=None):
+        return self.request('GET', url, token=token, headers=headers)
+
+    def put(self, url, token=None, headers=None, **kwargs):
+        return self.request('PUT', url, token=token, headers=headers, **kwargs)
+
+    def request(self, method, url, token=None, headers=None, **kwargs):
+        token = token or self.token
+        host = urlsplit(url).netloc
+        headers = {'Accept': 'application/vnd.github+json', **(headers or {})}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+
+        cache_key = cached = None
+        if method == 'GET':
+            cache_key = self._etag_key(url, token)
+            cached = cache.get(cache_key)
+            metrics.record_cache('github_etag', 'miss' if cached is None else 'hit')
+
+        reason = self._blocked(host, token)
+        if reason:
+            if cached:
+                return self._from_cache(cached, stale=True)
+            raise GitHubError(reason)
+
+        if cached:
+            headers['If-None-Match'] = cached['etag']
+        try:
+            with metrics.outbound(host):
+                response = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+        except requests.RequestException as exc:
+            self._record_failure(host)
+            if cached:
+                return self._from_cache(cached, stale=True)
+            raise GitHubError(f'Error connecting to GitHub: {exc}') from exc
+
+        self._record_rate_limit(host, token, response.headers)
+        if response.status_code >= 500:
+            self._record_failure(host)
+            if cached:
+                return self._from_cache(cached, stale=True)
+        else:
+            self._record_success(host)
+
+        if response.status_code == 304 and cached:
+            return self._from_cache(cached)
+        if cache_key and response.status_code == 200 and response.headers.get('ETag'):
+            cache.set(cache_key, {
+                'etag': response.headers['ETag'],
+                'content': response.content,
+                'headers': dict(response.headers),
+            }, ETAG_TTL)
+        return GitHubResponse(response.status_code, response.content, response.headers)
+
+    def _etag_key(self, url, token):
+        digest = hashlib.sha256(f'{token or ""} {url}'.encode()).hexdigest()
+        return f'github_etag_{digest}'
+
+    def _from_cache(self, cached, stale=False):
+        return GitHubResponse(200, cached['content'], cached['headers'], stale=stale)
+
+    def _blocked(self, host, token):
+        now = time.time()
+        with self._lock:
+            failures, opened_at = self._circuits.get(host, (0, None))
+            if opened_at is not None:
+                if now - opened_at < self.cooldown:
+                    return f'GitHub is unavailable (circuit open for {host})'
+                # Half-open: let this request through as a probe and hold
+                # everyone else back until it reports in.
+                self._circuits[host] = (failures, now)
+
+            remaining, reset = self._budgets.get((host, token), (None, None))
+            if remaining is not None and remaining <= self.rate_limit_reserve:
+                if now < reset:
+                    return 'GitHub rate limit budget exhausted'
+                del self._budgets[(host, token)]
+        return None
+
+    def _record_rate_limit(self, host, token, headers):
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        with self._lock:
+            self._budgets[(host, token)] = (int(remaining), int(reset))
+
+    def _record_failure(self, host):
+        with self._lock:
+            failures, opened_at = self._circuits.get(host, (0, None))
+            failures += 1
+            if failures >= self.failure_threshold:
+                if opened_at is None:
+                    logger.warning('Opening GitHub circuit for %s after %d failures', host, failures)
+                opened_at = time.time()
+            self._circuits[host] = (failures, opened_at)
+
+    def _record_success(self, host):
+        with self._lock:
+            self._circuits.pop(host, None)
+
+
+client = GitHubClient()
+
+# Shared pool so concurrent sync batches can't open an unbounded number of
+# connections to GitHub between them.
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'GITHUB_FETCH_WORKERS', 8),
+    thread_name_prefix='github-fetch',
+)
+
+
+def api_url(path):
+    return f"{getattr(settings, 'GITHUB_API_URL', 'https://api.github.com')}/{path}"
+
+
+def raw_url(path):
+    return f"{getattr(settings, 'GITHUB_RAW_URL', 'https://raw.githubusercontent.com')}/{path}"
+
+
+def repo_path(repo_link):
+    """Return 'owner/repo' for a GitHub URL, or None for anything else."""
+    if not repo_link or 'github.com' not in repo_link:
+        return None
+    return repo_link.split("github.com/")[1].replace('.git', '')
+
+
+def fetch_repo_data(repo_link):
+    """
+    Fetch forks count, default branch and raw README for a single repository.
+
+    Keys are only present for the parts GitHub answered successfully, so a
+    caller can keep its previous value for anything that failed.
+    """
+    github_data = {}
+    owner_repo = repo_path(repo_link)
+    if not owner_repo:
+        return github_data
+
+    try:
+        response = client.get(api_url(f"repos/{owner_repo}"))
+        if response.status_code == 200:
+            data = response.json()
+            github_data['forks_count'] = data.get("forks_count", 0)
+            github_data['default_branch'] = data.get("default_branch") or 'main'
+    except Exception:
+        logger.warning('Could not fetch repo metadata for %s', owner_repo, exc_info=True)
+
+    try:
+        branch = github_data.get('default_branch', 'main')
+        readme_response = client.get(raw_url(f"{owner_repo}/{branch}/README.md"))
+        if readme_response.status_code == 200:
+            github_data['readme'] = readme_response.text
+    except Exception:
+        logger.warning('Could not fetch README for %s', owner_repo, exc_info=True)
+    return github_data
+
+
+def _submit(fn, *args):
+    # Each call runs in a copy of this context so it reports to the caller's request metrics
+    return _executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+async def run_async(fn, *args):
+    """
+    Await ``fn(*args)`` on the shared pool.
+
+    Async views call GitHub through this, so a slow response ties up a pool
+    thread but never the event loop serving everyone else. There is no async
+    HTTP client among the dependencies, so calls in flight to GitHub are
+    still capped at the pool size (``GITHUB_FETCH_WORKERS``).
+    """
+    return await asyncio.wrap_future(_submit(fn, *args))
+
+
+def _gather(fn, keys, deadline):
+    """Run ``fn(key)`` for every key on the shared pool; return ``(results, missed)``."""
+    futures = {key: _submit(fn, key) for key in set(keys)}
+    if not futures:
+        return {}, set()
+
+    started = time.monotonic()
+    wait(futures.values(), timeout=deadline)
+    return _split(futures, started)
+
+
+async def _agather(fn, keys, deadline):
+    """``_gather`` for async callers: waits for the calls without blocking the event loop."""
+    futures = {key: _submit(fn, key) for key in set(keys)}
+    if not futures:
+        return {}, set()
+
+    started = time.monotonic()
+    waiters = [asyncio.wrap_future(future) for future in futures.values()]
+    for waiter in waiters:
+        # Outcomes are read from ``futures``; this keeps asyncio from logging them as unretrieved
+        waiter.add_done_callback(lambda waiter: waiter.cancelled() or waiter.exception())
+    await asyncio.wait(waiters, timeout=deadline)
+    return _split(futures, started)
+
+
+def _split(futures, started):
+    results, missed = {}, set()
+    for key, future in futures.items():
+        if not future.done():
+            missed.add(key)
+        else:
+            results[key] = future
+    if missed:
+        logger.info(
+            'GitHub fetch deadline hit after %.2fs: %d of %d calls pending',
+            time.monotonic() - started, len(missed), len(futures),
+        )
+    return results, missed
+
+
+def fetch_github_data(repo_links, deadline=None):
+    """
+    Fetch GitHub data for many repositories concurrently.
+
+    Returns a ``(results, missed)`` tuple: ``results`` maps each repo link
+    that finished within ``deadline`` seconds to its data, and ``missed`` is
+    the set of links that were still in flight when the deadline passed.
+    """
+    if deadline is None:
+        deadline = getattr(settings, 'GITHUB_FETCH_DEADLINE', 3)
+    futures, missed = _gather(fetch_repo_data, repo_links, deadline)
+    results = {
+        link: {} if future.exception() is not None else future.result()
+        for link, future in futures.items()
+    }
+    return results, missed
+
+
+def readme_gist_cache_key(username):
+    return f'readme_gist_{username}'
+
+
+def fetch_readme_gist(username):
+    """
+    Return the first 200 characters of a user's profile README and cache it.
+
+    Only a README or a 404 is cached; other statuses (rate limits, 5xx) raise
+    ``GitHubError`` so the next request asks GitHub again.
+    """
+    response = client.get(api_url(f'repos/{username}/{username}/readme'))
+    if response.status_code == 200:
+        content = base64.b64decode(response.json()['content']).decode('utf-8')
+        gist = content[:200]
+    elif response.status_code == 404:
+        gist = 'No profile README'
+    else:
+        raise GitHubError(f'GitHub answered {response.status_code} for the README of {username}')
+    # Cached from the worker thread so a fetch that misses the page deadline
+    # still warms the cache for the next request.
+    cache.set(readme_gist_cache_key(username), gist, README_GIST_TTL)
+    return gist
+
+
+def readme_gists(usernames, deadline=None):
+    """
+    Map each username to a profile README summary.
+
+    Cached summaries are returned without any HTTP; the rest are fetched
+    concurrently and get a placeholder if they miss ``deadline``.
+    """
+    if deadline is None:
+        deadline = getattr(settings, 'GITHUB_FETCH_DEADLINE', 3)
+    usernames = set(usernames)
+    gists = _cached_gists(usernames, cache.get_many([readme_gist_cache_key(u) for u in usernames]))
+    futures, missed = _gather(fetch_readme_gist, usernames - gists.keys(), deadline)
+    return _collect_gists(gists, futures, missed)
+
+
+async def areadme_gists(usernames, deadline=None):
+    """``readme_gists`` for async views."""
+    if deadline is None:
+        deadline = getattr(settings, 'GITHUB_FETCH_DEADLINE', 3)
+    usernames = set(usernames)
+    gists = _cached_gists(usernames, await cache.aget_many([readme_gist_cache_key(u) for u in usernames]))
+    futures, missed = await _agather(fetch_readme_gist, usernames - gists.keys(), deadline)
+    return _collect_gists(gists, futures, missed)
+
+
+def _cached_gists(usernames, cached):
+    gists = {u: cached[readme_gist_cache_key(u)] for u in usernames if readme_gist_cache_key(u) in cached}
+    metrics.record_cache('readme_gist', 'hit', len(gists))
+    metrics.record_cache('readme_gist', 'miss', len(usernames) - len(gists))
+    return gists
+
+
+def _collect_gists(gists, futures, missed):
+    for username, future in futures.items():
+        gists[username] = 'Error fetching README' if future.exception() is not None else future.result()
+    for username in missed:
+        gists[username] = 'README not loaded yet'
+    return gists
+
+
+def invite_collaborator(repo_link, username, token):
+    """
+    Invite ``username`` to collaborate on ``repo_link``.
+
+    Returns ``(ok, message, status_code)``; ``status_code`` is None when
+    GitHub could not be reached at all, and 429 for any rate limit.
+    """
+    repo_parts = repo_link.rstrip('/').split('/')
+    repo_owner, repo_name = repo_parts[-2], repo_parts[-1]
+    try:
+        response = client.put(api_url(f"repos/{repo_owner}/{repo_name}/collaborators/{username}"), token=token)
+    except GitHubError as e:
+        return False, str(e), None
+
+    if response.status_code == 201:
+        return True, f"Successfully invited {username} as a collaborator.", 201
+    if response.status_code == 204:
+        return True, f"{username} is already a collaborator.", 204
+    message = response.json().get('message', 'Unknown error')
+    error = f"GitHub API Error {response.status_code}: {message}"
+    # GitHub answers rate limits with 403 as well as 429; report them all as
+    # 429 so callers can tell them from a 403 that won't go away, such as
+    # missing admin rights.
+    if response.status_code == 403 and rate_limited(response, message):
+        return False, error, 429
+    return False, error, response.status_code
+
+
+def rate_limited(response, message=''):
+    """Whether a 403 or 429 from GitHub is a (primary or secondary) rate limit."""
+    return (
+        response.headers.get('X-RateLimit-Remaining') == '0'
+        or 'Retry-After' in response.headers
+        or 'rate limit' in message.lower()
+    )
@@ -0,0 +1,161 @@
+"""
+A local stand-in for the GitHub endpoints this app calls, for benchmarks.
+
+``GitHubStub`` serves the repo, profile README, raw README, collaborator
+invite and avatar endpoints from a thread on localhost with a configurable
+delay, and counts the requests it gets. Point ``GITHUB_API_URL``,
+``GITHUB_RAW_URL`` and ``GITHUB_AVATAR_URL`` at ``stub.api_url``,
+``stub.raw_url`` and ``stub.web_url`` and runs are reproducible without
+network access.
+"""
+import base64
+import hashlib
+import json
+import re
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROUTES = [
+    ('PUT', re.compile(r'^/api/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/collaborators/(?P<user>[^/]+)$'), 'invite'),
+    ('GET', re.compile(r'^/api/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/readme$'), 'profile_readme'),
+    ('GET', re.compile(r'^/api/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)$'), 'repo'),
+    ('GET', re.compile(r'^/raw/(?P<owner>[^/]+)/(?P<repo>[^/]+)/(?P<branch>[^/]+)/README\.md$'), 'raw_readme'),
+    ('GET', re.compile(r'^/web/(?P<user>[^/]+)\.png$'), 'avatar'),
+]
+
+
+def readme_for(owner, repo):
+    return (
+        f"# {repo}\n\n"
+        f"{repo} is maintained by {owner}. It is a stand-in README served by the local GitHub stub.\n\n"
+        "## Getting started\n\n"
+        "```\npip install -e .\n```\n\n"
+        "- Fork the repo\n- Create a branch\n- Open a pull request\n"
+    )
+
+
+def png(size, rgb):
+    """A ``size`` x ``size`` PNG in one colour."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    rows = b''.join(b'\x00' + bytes(rgb) * size for _ in range(size))
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(rows))
+        + chunk(b'IEND', b'')
+    )
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def _handle(self, method):
+        stub = self.server.stub
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(self.path.split('?')[0])
+            if route_method == method and match:
+                break
+        else:
+            name, match = None, None
+        stub.record(name or 'unknown')
+        if stub.latency:
+            time.sleep(stub.latency)
+        if match is None:
+            return self._send(404, {'message': 'Not Found'})
+        params = match.groupdict()
+        if name == 'repo':
+            seed = int(hashlib.sha256(f"{params['owner']}/{params['repo']}".encode()).hexdigest(), 16)
+            return self._send(200, {'forks_count': seed % 500, 'default_branch': 'main'})
+        if name == 'profile_readme':
+            content = base64.b64encode(readme_for(params['owner'], params['repo']).encode()).decode()
+            return self._send(200, {'content': content, 'encoding': 'base64'})
+        if name == 'raw_readme':
+            return self._send(200, readme_for(params['owner'], params['repo']), content_type='text/plain')
+        if name == 'invite':
+            return self._send(201, {'invitee': {'login': params['user']}})
+        if name == 'avatar':
+            size = re.search(r'[?&]size=(\d+)', self.path)
+            colour = hashlib.sha256(params['user'].lower().encode()).digest()[:3]
+            return self._send(200, png(min(int(size.group(1)) if size else 460, 460), colour), content_type='image/png')
+
+    def _send(self, status, body, content_type='application/json'):
+        data = json.dumps(body) if content_type == 'application/json' else body
+        data = data if isinstance(data, bytes) else data.encode()
+        etag = '"{}"'.format(hashlib.sha1(data).hexdigest())
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('ETag', etag)
+        self.send_header('X-RateLimit-Remaining', '4999')
+        self.send_header('X-RateLimit-Reset', str(int(time.time()) + 3600))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GitHubStub:
+    def __init__(self, latency=0.0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def api_url(self):
+        return f'{self.base_url}/api'
+
+    @property
+    def raw_url(self):
+        return f'{self.base_url}/raw'
+
+    @property
+    def web_url(self):
+        return f'{self.base_url}/web'
+
+    def record(self, endpoint):
+        with self._lock:
+            self.counts[endpoint] += 1
+
+    def total(self):
+        with self._lock:
+            return sum(self.counts.values())
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='github-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
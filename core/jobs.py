@@ -0,0 +1,185 @@
+"""
+Durable background jobs stored in the ``Job`` table.
+
+Work is enqueued under an idempotency key, so enqueueing the same thing twice
+yields one job. ``manage.py run_jobs`` claims due jobs with a lease, runs
+them on a thread pool and retries failures with exponential backoff until
+``max_attempts``, after which the job is parked as ``dead`` for inspection.
+A job that can't run until something else changes, such as an invite whose
+project owner has no GitHub token yet, is parked as ``waiting`` instead,
+without using up attempts, until ``resume_invites`` queues it again.
+"""
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import github
+from .models import Job, Profile
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 30  # seconds before the first retry
+BACKOFF_MAX = 3600
+LEASE = timedelta(minutes=5)
+
+
+class RetryableJobError(Exception):
+    """The job failed but may succeed later."""
+
+
+class PermanentJobError(Exception):
+    """The job can never succeed; retrying would only repeat the failure."""
+
+
+class WaitingJobError(Exception):
+    """The job can't run until something outside it changes; retrying on a timer is pointless."""
+
+
+WAITING_FOR_TOKEN = 'Waiting for the project owner to set a GitHub access token.'
+
+
+def invite_job_key(project_id, requester_id):
+    return f'invite:{project_id}:{requester_id}'
+
+
+def enqueue(kind, idempotency_key, payload, contributor_request=None):
+    """Queue a job, or return the existing one for ``idempotency_key``.
+
+    A job that already died is queued again from scratch; anything else is
+    left alone so the work happens once.
+    """
+    job, created = Job.objects.get_or_create(
+        idempotency_key=idempotency_key,
+        defaults={'kind': kind, 'payload': payload, 'contributor_request': contributor_request},
+    )
+    if not created and job.status == 'dead':
+        job.status, job.attempts, job.run_after, job.last_error = 'queued', 0, timezone.now(), ''
+        job.payload = payload
+        job.save()
+    return job
+
+
+def enqueue_invite(contributor_request, username):
+    return enqueue(
+        'invite_collaborator',
+        invite_job_key(contributor_request.project_id, contributor_request.requester_id),
+        {
+            'repo_link': contributor_request.project.repo_link,
+            'username': username,
+            'owner_id': contributor_request.project.owner_id,
+        },
+        contributor_request=contributor_request,
+    )
+
+
+def resume_invites(owner_id):
+    """Queue ``owner_id``'s invites that were waiting for their GitHub token; return how many."""
+    return Job.objects.filter(
+        # Dead ones too: before jobs could wait, they used up their attempts
+        Q(status='waiting') | Q(status='dead', last_error=WAITING_FOR_TOKEN),
+        kind='invite_collaborator',
+        payload__owner_id=owner_id,
+    ).update(status='queued', attempts=0, run_after=timezone.now(), last_error='')
+
+
+def run_invite(job):
+    # The owner's token is read at run time so it is never copied into the
+    # job table; saving one resumes the job (see core.signals).
+    profile = Profile.objects.filter(user_id=job.payload['owner_id']).first()
+    if not profile or not profile.access_token:
+        raise WaitingJobError(WAITING_FOR_TOKEN)
+    ok, message, status_code = github.invite_collaborator(
+        job.payload['repo_link'], job.payload['username'], profile.access_token,
+    )
+    if ok:
+        return message
+    # Other 4xx answers (unknown repo or user, no admin rights on the repo,
+    # bad token scope) won't change on retry; rate limits (429), 5xx and
+    # network errors may.
+    if status_code and 400 <= status_code < 500 and status_code != 429:
+        raise PermanentJobError(message)
+    raise RetryableJobError(message)
+
+
+HANDLERS = {
+    'invite_collaborator': run_invite,
+}
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim(limit):
+    """Lease up to ``limit`` due jobs to this worker and return them."""
+    now = timezone.now()
+    due = (
+        Job.objects
+        .filter(
+            Q(status__in=['queued', 'retrying'], run_after__lte=now)
+            # A worker that died mid-job leaves it running with an expired lease
+            | Q(status='running', locked_until__lt=now)
+        )
+        .order_by('run_after')
+        .values_list('id', 'status', 'attempts')[:limit]
+    )
+    claimed = []
+    for job_id, status, attempts in due:
+        # Compare-and-swap so two workers never run the same job
+        won = Job.objects.filter(id=job_id, status=status, attempts=attempts).update(
+            status='running', attempts=F('attempts') + 1, locked_until=now + LEASE,
+        )
+        if won:
+            claimed.append(job_id)
+    return list(Job.objects.filter(id__in=claimed))
+
+
+def execute(job):
+    """Run one claimed job and record the outcome."""
+    try:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            raise PermanentJobError(f'No handler for job kind {job.kind!r}')
+        result = handler(job)
+    except WaitingJobError as e:
+        # Not a real try, so the attempt claim() counted is given back
+        job.status, job.attempts, job.last_error = 'waiting', job.attempts - 1, str(e)
+    except Exception as e:
+        error = str(e) or e.__class__.__name__
+        if isinstance(e, PermanentJobError) or job.attempts >= job.max_attempts:
+            logger.warning('Job %s is dead after %d attempt(s): %s', job.idempotency_key, job.attempts, error)
+            job.status = 'dead'
+        else:
+            job.status = 'retrying'
+            job.run_after = timezone.now() + backoff(job.attempts)
+        job.last_error = error
+    else:
+        job.status, job.result, job.last_error = 'succeeded', result or '', ''
+    job.locked_until = None
+    job.save(update_fields=['status', 'attempts', 'run_after', 'result', 'last_error', 'locked_until', 'updated_at'])
+    return job
+
+
+def _execute_in_thread(job):
+    try:
+        return execute(job)
+    finally:
+        connection.close()
+
+
+def run_pending(limit=50, concurrency=8):
+    """Claim and run one batch of due jobs concurrently; return how many ran."""
+    jobs = claim(limit)
+    if concurrency <= 1:
+        for job in jobs:
+            execute(job)
+    elif jobs:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='jobs') as executor:
+            list(executor.map(_execute_in_thread, jobs))
+    return len(jobs)
@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Django's defaults when DATABASES has no OPTIONS: rollback journal, a 5 second
+# busy timeout, deferred transactions and a new connection per request.
+DEFAULT_PROFILE = {
+    'timeout': 5,
+    'transaction_mode': 'DEFERRED',
+    'init_commands': [],
+    'persistent': False,
+}
+
+SCHEMA = """
+CREATE TABLE project (id INTEGER PRIMARY KEY, like_count INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE project_likes (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    UNIQUE (project_id, user_id)
+);
+CREATE TABLE comment (id INTEGER PRIMARY KEY, project_id INTEGER NOT NULL, user_id INTEGER NOT NULL, text TEXT);
+"""
+
+
+def configured_profile():
+    """The profile described by settings.DATABASES['default']."""
+    db = settings.DATABASES['default']
+    options = db.get('OPTIONS', {})
+    return {
+        'timeout': options.get('timeout', 5),
+        'transaction_mode': (options.get('transaction_mode') or 'DEFERRED').upper(),
+        'init_commands': [c.strip() for c in options.get('init_command', '').split(';') if c.strip()],
+        'persistent': db.get('CONN_MAX_AGE', 0) != 0,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure SQLite write throughput under parallel clients with Django's default "
+        "connection settings and with the ones in settings.DATABASES."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8,
+                            help='Number of concurrent writers.')
+        parser.add_argument('--ops', type=int, default=200,
+                            help='Writes per client.')
+        parser.add_argument('--projects', type=int, default=5,
+                            help='Projects the writes are spread over; fewer means more contention.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['clients']} clients x {options['ops']} writes over {options['projects']} project(s)"
+        )
+        self.stdout.write(f"{'profile':<10} {'ops/s':>9} {'ok':>7} {'locked':>7} {'p50 ms':>8} {'p99 ms':>8}")
+        for name, profile in (('default', DEFAULT_PROFILE), ('tuned', configured_profile())):
+            result = self.run(profile, options['clients'], options['ops'], options['projects'])
+            self.stdout.write(
+                f"{name:<10} {result['throughput']:>9.0f} {result['ok']:>7} {result['locked']:>7} "
+                f"{result['p50']:>8.2f} {result['p99']:>8.2f}"
+            )
+
+    def run(self, profile, clients, ops, projects):
+        # Always a scratch file: the benchmark never touches the real database
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.sqlite3')
+            setup = sqlite3.connect(path)
+            setup.executescript(SCHEMA)
+            setup.executemany('INSERT INTO project (id) VALUES (?)', [(i,) for i in range(projects)])
+            setup.commit()
+            setup.close()
+
+            latencies, locked = [], []
+            lock = threading.Lock()
+            start = threading.Barrier(clients + 1)
+
+            def client(user_id):
+                conn = None
+                mine, errors = [], 0
+                start.wait()
+                for op in range(ops):
+                    began = time.perf_counter()
+                    if conn is None:
+                        conn = self.connect(path, profile)
+                    try:
+                        self.write(conn, profile, op % projects, user_id, op)
+                        mine.append(time.perf_counter() - began)
+                    except sqlite3.OperationalError as e:
+                        if 'locked' not in str(e) and 'busy' not in str(e):
+                            raise
+                        conn.rollback()
+                        errors += 1
+                    if not profile['persistent']:
+                        conn.close()
+                        conn = None
+                if conn is not None:
+                    conn.close()
+                with lock:
+                    latencies.extend(mine)
+                    locked.append(errors)
+
+            threads = [threading.Thread(target=client, args=(user_id,)) for user_id in range(clients)]
+            for thread in threads:
+                thread.start()
+            start.wait()
+            began = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - began
+
+        latencies.sort()
+        return {
+            'throughput': len(latencies) / elapsed,
+            'ok': len(latencies),
+            'locked': sum(locked),
+            'p50': statistics.median(latencies) * 1000 if latencies else 0,
+            'p99': latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0,
+        }
+
+    def connect(self, path, profile):
+        # isolation_level=None: transactions are begun explicitly, as Django does
+        conn = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None, check_same_thread=False)
+        for command in profile['init_commands']:
+            conn.execute(command)
+        return conn
+
+    def write(self, conn, profile, project_id, user_id, op):
+        # The shape of a typical write view: read, then write, in one transaction
+        conn.execute(f"BEGIN {profile['transaction_mode']}")
+        liked = conn.execute(
+            'SELECT 1 FROM project_likes WHERE project_id = ? AND user_id = ?', (project_id, user_id),
+        ).fetchone()
+        if liked:
+            conn.execute('DELETE FROM project_likes WHERE project_id = ? AND user_id = ?', (project_id, user_id))
+        else:
+            conn.execute('INSERT INTO project_likes (project_id, user_id) VALUES (?, ?)', (project_id, user_id))
+        conn.execute(
+            'UPDATE project SET like_count = MAX(like_count + ?, 0) WHERE id = ?',
+            (-1 if liked else 1, project_id),
+        )
+        if op % 4 == 0:
+            conn.execute(
+                'INSERT INTO comment (project_id, user_id, text) VALUES (?, ?, ?)', (project_id, user_id, 'bench'),
+            )
+        conn.execute('COMMIT')
@@ -0,0 +1,118 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Q
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import markdown_cache
+from core.github_stub import GitHubStub
+from core.models import Project
+from core.pagination import encode_cursor
+
+from .seed_bench import PREFIX
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main views through the test client against seed_bench data and a local "
+        "GitHub stub, reporting latency, SQL query counts and outbound HTTP calls per view."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='Requests per view after the first (cold) one.')
+        parser.add_argument('--latency', type=float, default=0.05,
+                            help='Seconds the GitHub stub waits before answering.')
+        parser.add_argument('--cold', action='store_true',
+                            help='Clear caches before every request, not just the first.')
+        parser.add_argument('--json', action='store_true',
+                            help='Print results as JSON instead of a table.')
+
+    def handle(self, *args, **options):
+        viewer, urls = self.subjects()
+        with GitHubStub(latency=options['latency']) as stub, override_settings(
+            GITHUB_API_URL=stub.api_url,
+            GITHUB_RAW_URL=stub.raw_url,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        ):
+            client = Client()
+            client.force_login(viewer)
+            results = [self.measure(client, stub, name, url, options) for name, url in urls]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{'view':<18} {'first ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} {'http':>6}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['view']:<18} {r['first_ms']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                f"{r['queries']:>8} {r['http']:>6}"
+            )
+
+    def subjects(self):
+        """The bench user who owns the most pending requests, and the URLs to drive."""
+        viewer = (
+            User.objects.filter(username__startswith=PREFIX)
+            .annotate(pending=Count('projects__requests', filter=Q(projects__requests__status='pending')))
+            .order_by('-pending', 'id')
+            .first()
+        )
+        if viewer is None:
+            raise CommandError('No bench data found; run `manage.py seed_bench` first.')
+        busiest = Project.objects.annotate(comment_total=Count('comments')).order_by('-comment_total', 'id').first()
+        # Where the second feed page starts
+        page_size = settings.FEED_PAGE_SIZE
+        last_on_first_page = Project.objects.order_by('-created_at', '-id')[page_size - 1:page_size].first()
+        urls = [
+            ('home', reverse('home')),
+            ('profile', reverse('profile')),
+            ('manage_requests', reverse('manage_requests')),
+            ('search', reverse('search') + '?q=parser'),
+        ]
+        # Either may be missing from a dataset smaller than a feed page
+        if busiest:
+            urls.insert(1, ('project_detail', reverse('project_detail', args=[busiest.id])))
+        if last_on_first_page:
+            cursor = encode_cursor(last_on_first_page.created_at, last_on_first_page.id)
+            urls.insert(1, ('home_feed', reverse('home_feed') + f'?cursor={cursor}'))
+        return viewer, urls
+
+    def measure(self, client, stub, name, url, options):
+        timings, queries, http = [], [], []
+        for i in range(options['iterations'] + 1):
+            if i == 0 or options['cold']:
+                cache.clear()
+                markdown_cache._local.clear()
+            calls_before = stub.total()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{name} answered {response.status_code}')
+            queries.append(len(captured.captured_queries))
+            http.append(stub.total() - calls_before)
+        warm = timings[1:] or timings
+        return {
+            'view': name,
+            'first_ms': timings[0],
+            'p50_ms': statistics.median(warm),
+            'p95_ms': percentile(warm, 0.95),
+            'queries': int(statistics.median(queries)),
+            'http': sum(http),
+        }
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = "Recompute drifted Project.like_count and Profile.reputation counters in bulk."
+
+    def handle(self, *args, **options):
+        projects, profiles = reconcile()
+        self.stdout.write(f"Fixed {projects} project like count(s) and {profiles} reputation score(s).")
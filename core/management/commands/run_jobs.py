@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import run_pending
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (collaborator invites), retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Number of jobs claimed per batch.')
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='Number of jobs run at the same time.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, sleeping --interval seconds when the queue is empty.')
+        parser.add_argument('--interval', type=int, default=5,
+                            help='Seconds to sleep between polls when --loop is set.')
+
+    def handle(self, *args, **options):
+        while True:
+            ran = 0
+            while True:
+                batch = run_pending(options['batch_size'], options['concurrency'])
+                ran += batch
+                if batch < options['batch_size']:
+                    break
+            if ran:
+                self.stdout.write(f"Ran {ran} job(s).")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,163 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from social_django.models import UserSocialAuth
+
+from core.counters import reconcile
+from core.markdown_cache import render_markdown
+from core.models import Comment, ContributorRequest, Profile, Project, RepoSnapshot, Skill
+from core.skills import skill_index
+
+PREFIX = 'bench_'
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+SKILLS = [
+    'Python', 'Django', 'JavaScript', 'TypeScript', 'React', 'Vue', 'Go', 'Rust', 'Java', 'Kotlin',
+    'Swift', 'C', 'C++', 'C#', 'Ruby', 'Rails', 'PHP', 'SQL', 'PostgreSQL', 'SQLite', 'Docker',
+    'Kubernetes', 'AWS', 'Terraform', 'GraphQL', 'CSS', 'HTML', 'Machine Learning', 'Data Science',
+    'DevOps', 'Testing', 'Documentation', 'Design', 'Security', 'Android', 'iOS',
+]
+WORDS = (
+    'fast simple tiny modern async typed open minimal friendly secure scalable streaming '
+    'parser client server library framework toolkit plugin engine dashboard tracker bot api '
+    'cli game editor compiler scheduler cache queue search index sync backup monitor'
+).split()
+
+
+def sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def readme(rng, name):
+    sections = '\n\n'.join(f"## {rng.choice(WORDS).title()}\n\n{sentence(rng, 30)}" for _ in range(rng.randint(1, 4)))
+    return f"# {name}\n\n{sentence(rng, 20)}\n\n{sections}\n"
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create a synthetic dataset of bench_* users, projects, likes, comments and "
+        "contributor requests for benchmarking (see bench_views)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', default='1k',
+                            help='Number of projects: 1k, 10k, 100k or any integer.')
+        parser.add_argument('--seed', type=int, default=42,
+                            help='Random seed, so the same size always gives the same data.')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete existing bench_* data first.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        size = options['size']
+        try:
+            projects = SIZES[size] if size in SIZES else int(size)
+        except ValueError:
+            raise CommandError(f"--size must be one of {', '.join(SIZES)} or an integer, not {size!r}")
+        if options['clear']:
+            deleted, _ = User.objects.filter(username__startswith=PREFIX).delete()
+            self.stdout.write(f"Deleted {deleted} existing bench row(s).")
+        elif User.objects.filter(username__startswith=PREFIX).exists():
+            raise CommandError('Bench data already exists; pass --clear to replace it.')
+
+        counts = self.seed(projects, random.Random(options['seed']), options['batch_size'])
+        # Bulk inserts bypass the signals that keep derived state current
+        reconcile()
+        skill_index.invalidate()
+        cache.clear()
+        self.stdout.write('Created ' + ', '.join(f'{n} {name}' for name, n in counts.items()) + '.')
+
+    @transaction.atomic
+    def seed(self, project_count, rng, batch_size):
+        user_count = max(project_count // 2, 10)
+        now = timezone.now()
+
+        skills = [Skill.objects.get_or_create(name=name)[0] for name in SKILLS]
+        users = User.objects.bulk_create(
+            [User(username=f'{PREFIX}user{i}') for i in range(user_count)], batch_size=batch_size,
+        )
+        UserSocialAuth.objects.bulk_create([
+            UserSocialAuth(user=user, provider='github', uid=f'{PREFIX}{user.id}', extra_data={'login': user.username})
+            for user in users
+        ], batch_size=batch_size)
+        profiles = Profile.objects.bulk_create([
+            Profile(
+                user=user,
+                bio=sentence(rng),
+                # The rest have their README summary fetched from GitHub
+                readme=readme(rng, user.username) if rng.random() < 0.5 else None,
+                paypal='https://paypal.me/bench' if rng.random() < 0.3 else None,
+                access_token='b' * 40 if rng.random() < 0.5 else None,
+            )
+            for user in users
+        ], batch_size=batch_size)
+        Profile.skills.through.objects.bulk_create([
+            Profile.skills.through(profile=profile, skill=skill)
+            for profile in profiles for skill in rng.sample(skills, rng.randint(1, 5))
+        ], batch_size=batch_size)
+
+        # Spread creation times over the last year so feed pages look real
+        owners = [rng.choice(users) for _ in range(project_count)]
+        projects = Project.objects.bulk_create([
+            Project(
+                owner=owner,
+                repo_link=f'https://github.com/{owner.username}/{rng.choice(WORDS)}-{i}',
+                description=sentence(rng, rng.randint(6, 30)),
+                contributors_needed=rng.randint(0, 5),
+                paypal=rng.random() < 0.3,
+            )
+            for i, owner in enumerate(owners)
+        ], batch_size=batch_size)
+        for project in projects:
+            project.created_at = now - timedelta(minutes=rng.randint(0, 525_600))
+        Project.objects.bulk_update(projects, ['created_at'], batch_size=batch_size)
+
+        Project.desired_skills.through.objects.bulk_create([
+            Project.desired_skills.through(project=project, skill=skill)
+            for project in projects for skill in rng.sample(skills, rng.randint(1, 4))
+        ], batch_size=batch_size)
+
+        # READMEs come from a pool so rendering stays cheap at 100k projects
+        pool = [readme(rng, f'{rng.choice(WORDS)}-{i}') for i in range(200)]
+        rendered_pool = {text: render_markdown(text) for text in pool}
+        snapshots = []
+        for project in projects:
+            if rng.random() < 0.9:
+                text = rng.choice(pool)
+                rendered = rendered_pool[text]
+                snapshots.append(RepoSnapshot(
+                    project=project, forks_count=rng.randint(0, 500), default_branch='main', readme=text,
+                    readme_html=rendered.html, readme_preview=rendered.preview, fetched_at=now,
+                ))
+            else:
+                snapshots.append(RepoSnapshot(project=project))
+        RepoSnapshot.objects.bulk_create(snapshots, batch_size=batch_size)
+
+        # Skewed popularity: a few projects collect most likes and comments
+        likes, comments, requests = set(), [], set()
+        for project in projects:
+            popularity = int(rng.paretovariate(1.5))
+            for user in rng.sample(users, min(popularity * 3, user_count)):
+                likes.add((project.id, user.id))
+            for _ in range(min(popularity * 2, 200)):
+                comments.append(Comment(project=project, user=rng.choice(users), text=sentence(rng)))
+            for user in rng.sample(users, min(popularity, 20, user_count)):
+                if user.id != project.owner_id:
+                    requests.add((project.id, user.id))
+        Project.likes.through.objects.bulk_create(
+            [Project.likes.through(project_id=p, user_id=u) for p, u in likes], batch_size=batch_size,
+        )
+        Comment.objects.bulk_create(comments, batch_size=batch_size)
+        ContributorRequest.objects.bulk_create([
+            ContributorRequest(project_id=p, requester_id=u, status=rng.choice(['pending'] * 3 + ['accepted', 'rejected']))
+            for p, u in requests
+        ], batch_size=batch_size)
+
+        return {
+            'users': len(users), 'projects': len(projects), 'likes': len(likes),
+            'comments': len(comments), 'requests': len(requests),
+        }
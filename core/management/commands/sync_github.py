@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core import cache_tags
+from core.github import fetch_github_data
+from core.markdown_cache import render_markdown
+from core.models import Project, RepoSnapshot
+
+
+class Command(BaseCommand):
+    help = "Refresh stale GitHub repo snapshots in batches, oldest first."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Number of repos fetched concurrently per batch.')
+        parser.add_argument('--max-age', type=int, default=3600,
+                            help='Seconds after which a snapshot is considered stale.')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, sleeping --interval seconds between passes.')
+        parser.add_argument('--interval', type=int, default=60,
+                            help='Seconds to sleep between passes when --loop is set.')
+
+    def handle(self, *args, **options):
+        while True:
+            refreshed = self.sync(options['batch_size'], options['max_age'])
+            self.stdout.write(f"Refreshed {refreshed} snapshot(s).")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def sync(self, batch_size, max_age):
+        # New projects get an empty snapshot so they join the queue up front
+        missing = Project.objects.filter(snapshot__isnull=True).values_list('id', flat=True)
+        RepoSnapshot.objects.bulk_create(
+            [RepoSnapshot(project_id=project_id) for project_id in missing],
+            ignore_conflicts=True,
+        )
+
+        refreshed = 0
+        skipped = set()
+        while True:
+            cutoff = timezone.now() - timedelta(seconds=max_age)
+            batch = list(
+                RepoSnapshot.objects
+                .filter(Q(fetched_at__isnull=True) | Q(fetched_at__lt=cutoff))
+                .exclude(id__in=skipped)
+                .select_related('project')
+                .order_by(F('fetched_at').asc(nulls_first=True), 'id')[:batch_size]
+            )
+            if not batch:
+                return refreshed
+
+            results, missed = fetch_github_data({s.project.repo_link for s in batch})
+            now = timezone.now()
+            updated, changed = [], []
+            for snapshot in batch:
+                if snapshot.project.repo_link in missed:
+                    # Left stale so it stays at the front of the queue next pass
+                    skipped.add(snapshot.id)
+                    continue
+                data = results.get(snapshot.project.repo_link, {})
+                shown = (snapshot.fetched_at is None, snapshot.forks_count, snapshot.readme)
+                if 'readme' in data and (data['readme'] != snapshot.readme or not snapshot.readme_html):
+                    rendered = render_markdown(data['readme'])
+                    snapshot.readme_html, snapshot.readme_preview = rendered.html, rendered.preview
+                for field, value in data.items():
+                    setattr(snapshot, field, value)
+                snapshot.fetched_at = now
+                updated.append(snapshot)
+                if shown != (False, snapshot.forks_count, snapshot.readme):
+                    changed.append(cache_tags.project_tag(snapshot.project_id))
+            RepoSnapshot.objects.bulk_update(
+                updated,
+                ['forks_count', 'default_branch', 'readme', 'readme_html', 'readme_preview', 'fetched_at'],
+            )
+            # bulk_update sends no signals; only cards whose content moved are dropped
+            cache_tags.invalidate(*changed)
+            refreshed += len(updated)
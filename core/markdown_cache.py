@@ -0,0 +1,87 @@
+"""
+Content-addressed cache of rendered Markdown.
+
+Rendered HTML and a short preview are stored in the ``RenderedMarkdown``
+table under the SHA-256 of the source, so every process shares them and a
+given README is only ever parsed once. A small in-process LRU sits in front
+of the table, and the table itself is capped at ``MARKDOWN_CACHE_MAX_ENTRIES``
+rows by evicting the least recently used ones.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import markdown
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from . import metrics
+from .models import RenderedMarkdown
+
+PREVIEW_WORDS = 25
+# Bumping last_used_at on every read would turn reads into writes
+TOUCH_INTERVAL = timedelta(hours=1)
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def digest(source):
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def render_markdown(source):
+    """Return the stored ``RenderedMarkdown`` for ``source``, rendering it on first sight."""
+    key = digest(source or '')
+    with _local_lock:
+        fragment = _local.get(key)
+        if fragment is not None:
+            _local.move_to_end(key)
+    if fragment is not None:
+        metrics.record_cache('markdown', 'hit')
+        return fragment
+
+    now = timezone.now()
+    fragment = RenderedMarkdown.objects.filter(digest=key).first()
+    metrics.record_cache('markdown', 'miss' if fragment is None else 'hit')
+    if fragment is None:
+        fragment = _store(key, source or '', now)
+    elif fragment.last_used_at < now - TOUCH_INTERVAL:
+        RenderedMarkdown.objects.filter(pk=fragment.pk).update(last_used_at=now)
+        fragment.last_used_at = now
+
+    with _local_lock:
+        _local[key] = fragment
+        while len(_local) > getattr(settings, 'MARKDOWN_LOCAL_CACHE_SIZE', 256):
+            _local.popitem(last=False)
+    return fragment
+
+
+def _store(key, source, now):
+    with metrics.timed('markdown'):
+        html = markdown.markdown(source)
+    fragment = RenderedMarkdown(
+        digest=key,
+        html=html,
+        preview=Truncator(html).words(PREVIEW_WORDS, html=True),
+        last_used_at=now,
+    )
+    try:
+        with transaction.atomic():
+            fragment.save()
+    except IntegrityError:
+        # Another process stored the same source first
+        return RenderedMarkdown.objects.get(digest=key)
+    _evict()
+    return fragment
+
+
+def _evict():
+    max_entries = getattr(settings, 'MARKDOWN_CACHE_MAX_ENTRIES', 10000)
+    excess = RenderedMarkdown.objects.count() - max_entries
+    if excess > 0:
+        oldest = RenderedMarkdown.objects.order_by('last_used_at').values_list('pk', flat=True)[:excess]
+        RenderedMarkdown.objects.filter(pk__in=list(oldest)).delete()
@@ -0,0 +1,282 @@
+"""
+Per-request performance instrumentation.
+
+``MetricsMiddleware`` gives every request a ``Timings``, which a wrapper on
+every database connection adds its SQL to (including queries the async ORM
+runs on another thread). Outbound HTTP is reported by ``core.github``, cache lookups by the code that
+does them (``record_cache``), and template and Markdown rendering through
+``timed``. When the response goes out, the totals are sent in a
+``Server-Timing`` header and folded into process-wide histograms that
+``/metrics`` serves in the Prometheus text format.
+
+Everything is plain counters under a lock, so it is cheap enough to leave on.
+The numbers are per process, like the LocMem cache; scrape each worker.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+SECONDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+PHASES = ('sql', 'http', 'template', 'markdown')
+HIT_RESULTS = ('hit', 'stale', 'wait')
+
+_current = ContextVar('request_timings', default=None)
+_lock = threading.Lock()
+
+
+def _labels(names, values):
+    escaped = (str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for v in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets=SECONDS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        with _lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def expose(self):
+        with _lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(snapshot.items()):
+            base = _labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{base}}} {series[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{base}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def expose(self):
+        with _lock:
+            snapshot = dict(self._values)
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{{{_labels(self.labelnames, labels)}}} {value}')
+        return lines
+
+
+request_seconds = Histogram(
+    'gitcollab_request_seconds', 'Time spent handling a request.', ('view',))
+request_phase_seconds = Histogram(
+    'gitcollab_request_phase_seconds', 'Time a request spent in SQL, outbound HTTP, templates and Markdown.',
+    ('view', 'phase'))
+request_queries = Histogram(
+    'gitcollab_request_queries', 'SQL queries run by a request.', ('view',), buckets=QUERIES)
+outbound_seconds = Histogram(
+    'gitcollab_outbound_http_seconds', 'Duration of each outbound HTTP call.', ('host',))
+cache_lookups = Counter(
+    'gitcollab_cache_lookups_total', 'Cache lookups by key family and result.', ('family', 'result'))
+
+REGISTRY = [request_seconds, request_phase_seconds, request_queries, outbound_seconds, cache_lookups]
+
+
+class Timings:
+    """What one request spent its time on. Worker threads may add to it too."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.hosts = {}   # host -> [calls, seconds]
+        self.caches = {}  # family -> {result: count}
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds, host=None):
+        with self._lock:
+            self.seconds[phase] += seconds
+            if host is not None:
+                calls = self.hosts.setdefault(host, [0, 0.0])
+                calls[0] += 1
+                calls[1] += seconds
+
+    def add_cache(self, family, result, count):
+        with self._lock:
+            results = self.caches.setdefault(family, {})
+            results[result] = results.get(result, 0) + count
+
+    def observe(self, view):
+        elapsed = time.perf_counter() - self.started
+        request_seconds.observe((view,), elapsed)
+        request_queries.observe((view,), self.queries)
+        for phase, seconds in self.seconds.items():
+            request_phase_seconds.observe((view, phase), seconds)
+        return elapsed
+
+    def header(self, elapsed):
+        """
+        Format as a ``Server-Timing`` value; durations are in milliseconds.
+
+        ``http`` sums calls made in parallel, so it can exceed ``app``.
+        """
+        entries = [
+            f'app;dur={elapsed * 1000:.1f}',
+            f'db;dur={self.seconds["sql"] * 1000:.1f};desc="{self.queries} queries"',
+        ]
+        with self._lock:
+            for host, (calls, seconds) in sorted(self.hosts.items()):
+                entries.append(f'http;dur={seconds * 1000:.1f};desc="{host} ({calls})"')
+            for family, results in sorted(self.caches.items()):
+                hits = sum(results.get(result, 0) for result in HIT_RESULTS)
+                entries.append(f'cache-{family};desc="{hits}/{sum(results.values())} hits"')
+        for phase in ('template', 'markdown'):
+            if self.seconds[phase]:
+                entries.append(f'{phase};dur={self.seconds[phase] * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def _sql(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        with timings._lock:
+            timings.queries += 1
+            timings.seconds['sql'] += seconds
+
+
+def watch_queries(sender, connection, **kwargs):
+    """``connection_created`` receiver that times every query run for a request."""
+    if _sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_sql)
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to the current request's ``phase``."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+@contextmanager
+def outbound(host):
+    """Time one outbound HTTP call to ``host``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        outbound_seconds.observe((host,), seconds)
+        timings = _current.get()
+        if timings is not None:
+            timings.add('http', seconds, host=host)
+
+
+def record_cache(family, result, count=1):
+    """Count ``count`` lookups in key ``family`` that ended in ``result`` (hit, miss, ...)."""
+    if not count:
+        return
+    cache_lookups.inc((family, result), count)
+    timings = _current.get()
+    if timings is not None:
+        timings.add_cache(family, result, count)
+
+
+def exposition():
+    return '\n'.join(line for metric in REGISTRY for line in metric.expose()) + '\n'
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    # Unresolved paths share one label so 404 probes can't grow the series
+    return (match.view_name if match else None) or 'unresolved'
+
+
+class MetricsMiddleware:
+    """
+    Record each request's ``Timings`` and send them as ``Server-Timing``.
+
+    Works in sync and async stacks alike, so under ASGI it doesn't push every
+    request through a thread just to be measured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        elapsed = timings.observe(view_name(request))
+        if getattr(settings, 'SERVER_TIMING', True):
+            response['Server-Timing'] = timings.header(elapsed)
+        return response
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with top-level renders timed per request."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
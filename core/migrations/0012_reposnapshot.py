@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_remove_project_access_token_profile_access_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepoSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('forks_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('default_branch', models.CharField(blank=True, max_length=255)),
+                ('readme', models.TextField(blank=True)),
+                ('readme_html', models.TextField(blank=True)),
+                ('fetched_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='snapshot', to='core.project')),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    Profile = apps.get_model('core', 'Profile')
+    Like = Project.likes.through
+    Project.objects.update(like_count=Coalesce(Subquery(
+        Like.objects.filter(project_id=OuterRef('pk'))
+        .values('project_id').annotate(total=Count('*')).values('total')
+    ), 0))
+    Profile.objects.update(reputation=Coalesce(Subquery(
+        Project.objects.filter(owner_id=OuterRef('user_id'))
+        .values('owner_id').annotate(total=Sum('like_count')).values('total')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_reposnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='reputation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
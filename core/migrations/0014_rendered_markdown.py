@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:36
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def populate_previews(apps, schema_editor):
+    RepoSnapshot = apps.get_model('core', 'RepoSnapshot')
+    snapshots = RepoSnapshot.objects.exclude(readme_html='')
+    for snapshot in snapshots.iterator():
+        snapshot.readme_preview = Truncator(snapshot.readme_html).words(25, html=True)
+        snapshot.save(update_fields=['readme_preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_like_count_reputation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedMarkdown',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('html', models.TextField()),
+                ('preview', models.TextField()),
+                ('last_used_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='reposnapshot',
+            name='readme_preview',
+            field=models.TextField(blank=True),
+        ),
+        migrations.RunPython(populate_previews, migrations.RunPython.noop),
+    ]
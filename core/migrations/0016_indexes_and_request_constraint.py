@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Which duplicate survives: the decided one if any, else the oldest
+STATUS_RANK = {'accepted': 0, 'rejected': 1, 'pending': 2}
+
+
+def remove_duplicate_requests(apps, schema_editor):
+    ContributorRequest = apps.get_model('core', 'ContributorRequest')
+    rows = ContributorRequest.objects.order_by('project_id', 'requester_id').values_list(
+        'id', 'project_id', 'requester_id', 'status',
+    )
+    keep, duplicates = {}, []
+    for request_id, project_id, requester_id, status in rows:
+        key = (project_id, requester_id)
+        rank = (STATUS_RANK.get(status, 3), request_id)
+        if key not in keep:
+            keep[key] = rank
+        elif rank < keep[key]:
+            duplicates.append(keep[key][1])
+            keep[key] = rank
+        else:
+            duplicates.append(request_id)
+    ContributorRequest.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='comment_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contributorrequest',
+            index=models.Index(fields=['project', 'status'], name='request_project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['-created_at', '-id'], name='project_feed_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_requests, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='contributorrequest',
+            constraint=models.UniqueConstraint(fields=('project', 'requester'), name='unique_request_per_project'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+from django.db import migrations
+
+# Full-text index over projects (see core.search). Triggers keep it in step
+# with every write path, including bulk_update and queryset.update().
+CREATE_TABLE = """
+CREATE VIRTUAL TABLE core_project_search USING fts5(
+    repo, description, skills, readme,
+    tokenize = 'porter unicode61'
+)
+"""
+
+INDEX_PROJECTS = """
+INSERT INTO core_project_search (rowid, repo, description, skills, readme)
+SELECT p.id,
+       replace(replace(p.repo_link, 'https://', ''), 'github.com/', ''),
+       p.description,
+       coalesce((SELECT group_concat(s.name, ' ')
+                 FROM core_project_desired_skills ps JOIN core_skill s ON s.id = ps.skill_id
+                 WHERE ps.project_id = p.id), ''),
+       coalesce(r.readme, '')
+FROM core_project p LEFT JOIN core_reposnapshot r ON r.project_id = p.id
+WHERE {where};
+"""
+
+
+def reindex(project_id):
+    return f"DELETE FROM core_project_search WHERE rowid = {project_id};" + INDEX_PROJECTS.format(
+        where=f'p.id = {project_id}',
+    )
+
+
+TRIGGERS = {
+    'core_project_search_project_ai': (
+        'AFTER INSERT ON core_project', reindex('new.id')),
+    'core_project_search_project_au': (
+        'AFTER UPDATE OF repo_link, description ON core_project '
+        'WHEN old.repo_link IS NOT new.repo_link OR old.description IS NOT new.description',
+        reindex('new.id')),
+    'core_project_search_project_ad': (
+        'AFTER DELETE ON core_project', 'DELETE FROM core_project_search WHERE rowid = old.id;'),
+    'core_project_search_readme_ai': (
+        'AFTER INSERT ON core_reposnapshot', reindex('new.project_id')),
+    'core_project_search_readme_au': (
+        'AFTER UPDATE OF readme ON core_reposnapshot WHEN old.readme IS NOT new.readme',
+        reindex('new.project_id')),
+    'core_project_search_skills_ai': (
+        'AFTER INSERT ON core_project_desired_skills', reindex('new.project_id')),
+    'core_project_search_skills_ad': (
+        'AFTER DELETE ON core_project_desired_skills', reindex('old.project_id')),
+    'core_project_search_skill_au': (
+        'AFTER UPDATE OF name ON core_skill WHEN old.name IS NOT new.name',
+        "DELETE FROM core_project_search WHERE rowid IN "
+        "(SELECT project_id FROM core_project_desired_skills WHERE skill_id = new.id);"
+        + INDEX_PROJECTS.format(
+            where='p.id IN (SELECT project_id FROM core_project_desired_skills WHERE skill_id = new.id)',
+        )),
+}
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_TABLE)
+    for name, (event, body) in TRIGGERS.items():
+        schema_editor.execute(f'CREATE TRIGGER {name} {event} BEGIN {body} END')
+    schema_editor.execute(INDEX_PROJECTS.format(where='1'))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    schema_editor.execute('DROP TABLE IF EXISTS core_project_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_indexes_and_request_constraint'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
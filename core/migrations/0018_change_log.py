@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:09
+
+from django.db import migrations, models
+
+
+# The change log behind the API's changes_since (see core.api). Each write
+# drops the object's previous entry and appends a new one, so an entry's seq
+# is the object's last write. That is a delete and an insert rather than
+# INSERT OR REPLACE: m2m adds run as INSERT OR IGNORE, and SQLite applies the
+# outer statement's conflict clause inside triggers too.
+def record(kind, object_id, user_id='NULL', deleted=0):
+    return (
+        f"DELETE FROM core_change WHERE kind = '{kind}' AND object_id = {object_id};"
+        f"INSERT INTO core_change (kind, object_id, user_id, deleted) "
+        f"VALUES ('{kind}', {object_id}, {user_id}, {deleted});"
+    )
+
+
+PROJECT_COLUMNS = ('owner_id', 'repo_link', 'description', 'contributors_needed', 'like_count')
+SNAPSHOT_COLUMNS = ('forks_count', 'default_branch', 'readme_html', 'readme_preview')
+
+
+def changed(columns):
+    return ' OR '.join(f'old.{column} IS NOT new.{column}' for column in columns)
+
+
+TRIGGERS = {
+    'core_change_project_ai': (
+        'AFTER INSERT ON core_project', record('project', 'new.id')),
+    'core_change_project_au': (
+        f'AFTER UPDATE ON core_project WHEN {changed(PROJECT_COLUMNS)}', record('project', 'new.id')),
+    'core_change_project_ad': (
+        'AFTER DELETE ON core_project', record('project', 'old.id', deleted=1)),
+    'core_change_snapshot_ai': (
+        'AFTER INSERT ON core_reposnapshot', record('project', 'new.project_id')),
+    'core_change_snapshot_au': (
+        f'AFTER UPDATE ON core_reposnapshot WHEN {changed(SNAPSHOT_COLUMNS)}', record('project', 'new.project_id')),
+    'core_change_project_skills_ai': (
+        'AFTER INSERT ON core_project_desired_skills', record('project', 'new.project_id')),
+    'core_change_project_skills_ad': (
+        'AFTER DELETE ON core_project_desired_skills', record('project', 'old.project_id')),
+    'core_change_skill_ai': (
+        'AFTER INSERT ON core_skill', record('skill', 'new.id')),
+    'core_change_skill_au': (
+        'AFTER UPDATE ON core_skill WHEN old.name IS NOT new.name', record('skill', 'new.id')),
+    'core_change_skill_ad': (
+        'AFTER DELETE ON core_skill', record('skill', 'old.id', deleted=1)),
+    'core_change_request_ai': (
+        'AFTER INSERT ON core_contributorrequest', record('request', 'new.id', 'new.requester_id')),
+    'core_change_request_au': (
+        'AFTER UPDATE ON core_contributorrequest WHEN old.status IS NOT new.status',
+        record('request', 'new.id', 'new.requester_id')),
+    'core_change_request_ad': (
+        'AFTER DELETE ON core_contributorrequest', record('request', 'old.id', 'old.requester_id', deleted=1)),
+}
+
+
+def create_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name, (event, body) in TRIGGERS.items():
+        schema_editor.execute(f'CREATE TRIGGER {name} {event} BEGIN {body} END')
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_project_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted', models.BooleanField(default=False)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'user_id', 'seq'], name='change_sync_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_change_per_object')],
+            },
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
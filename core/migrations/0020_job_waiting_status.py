@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_cache_tag_versions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('retrying', 'Retrying'), ('waiting', 'Waiting'), ('succeeded', 'Succeeded'), ('dead', 'Failed')], default='queued', max_length=20),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import migrations
+from django.utils import timezone
+
+# Sessions record the path of the backend that logged the user in, and
+# Django drops a session whose backend is no longer configured. Rewriting
+# them keeps everyone logged in across the switch to core.backends.
+OLD = 'social_core.backends.github.GithubOAuth2'
+NEW = 'core.backends.GithubOAuth2'
+
+
+def rename(old, new):
+    def rewrite(apps, schema_editor):
+        Session = apps.get_model('sessions', 'Session')
+        store = SessionStore()
+        for session in Session.objects.filter(expire_date__gt=timezone.now()).iterator():
+            data = store.decode(session.session_data)
+            if data.get(BACKEND_SESSION_KEY) == old:
+                data[BACKEND_SESSION_KEY] = new
+                session.session_data = store.encode(data)
+                session.save(update_fields=['session_data'])
+    return rewrite
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_job_waiting_status'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename(OLD, NEW), rename(NEW, OLD)),
+    ]
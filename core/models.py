@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Skill(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -18,17 +19,56 @@ class Project(models.Model):
     patreon = models.BooleanField(default=False)         # New field
     paypal = models.BooleanField(default=False)          # New field
     desired_skills = models.ManyToManyField(Skill, blank=True, related_name='projects')  # New field
+    like_count = models.PositiveIntegerField(default=0)  # Kept in sync with likes by core.signals
 
+    class Meta:
+        indexes = [
+            # Feed order, including the keyset pagination tie-breaker
+            models.Index(fields=['-created_at', '-id'], name='project_feed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.owner.username} - {self.repo_link}"
 
+class RepoSnapshot(models.Model):
+    """Last known GitHub state of a project's repo, kept fresh by ``manage.py sync_github``."""
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='snapshot')
+    forks_count = models.PositiveIntegerField(blank=True, null=True)
+    default_branch = models.CharField(max_length=255, blank=True)
+    readme = models.TextField(blank=True)
+    readme_html = models.TextField(blank=True)
+    readme_preview = models.TextField(blank=True)
+    fetched_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    def __str__(self):
+        return f"Snapshot of {self.project.repo_link}"
+
+class RenderedMarkdown(models.Model):
+    """Markdown rendered to HTML, keyed by the SHA-256 of its source (see core.markdown_cache)."""
+    digest = models.CharField(max_length=64, unique=True)
+    html = models.TextField()
+    preview = models.TextField()
+    last_used_at = models.DateTimeField(db_index=True)
+
+class CacheTag(models.Model):
+    """The current version of a cache tag (see core.cache_tags), shared by every process."""
+    name = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name} @ {self.version}"
+
 class Comment(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField(max_length=500)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'created_at', 'id'], name='comment_project_created_idx'),
+        ]
+
 class ContributorRequest(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='requests')
     requester = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -39,6 +79,15 @@ class ContributorRequest(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # One request per user and project; also serves the duplicate check
+            models.UniqueConstraint(fields=['project', 'requester'], name='unique_request_per_project'),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'status'], name='request_project_status_idx'),
+        ]
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio = models.TextField(blank=True, null=True)
@@ -50,10 +99,7 @@ class Profile(models.Model):
     paypal = models.URLField(blank=True, null=True)
     skills = models.ManyToManyField(Skill, blank=True, related_name='profiles')
     access_token = models.CharField(max_length=40, blank=True, null=True)  # New field
-
-    def reputation_score(self):
-        # Example logic for reputation score
-        return 42  # Replace with actual logic
+    reputation = models.PositiveIntegerField(default=0)  # Likes across owned projects, kept by core.signals
 
     def masked_access_token(self):
         if self.access_token:
@@ -63,7 +109,63 @@ class Profile(models.Model):
 
     def reputation_score(self):
         # Sum of likes from all projects owned by this user
-        return sum(project.likes.count() for project in self.user.projects.all())
+        return self.reputation
+
+    def __str__(self):
+        return f"{self.user.username}'s Profile"
+
+class Job(models.Model):
+    """A unit of background work run by ``manage.py run_jobs`` (see core.jobs)."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('retrying', 'Retrying'),
+        ('waiting', 'Waiting'),
+        ('succeeded', 'Succeeded'),
+        ('dead', 'Failed'),
+    ]
+    kind = models.CharField(max_length=50)
+    idempotency_key = models.CharField(max_length=255, unique=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=6)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    result = models.TextField(blank=True)
+    contributor_request = models.ForeignKey(
+        ContributorRequest, on_delete=models.CASCADE, related_name='jobs', blank=True, null=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"{self.kind} ({self.idempotency_key}): {self.status}"
+
+class Change(models.Model):
+    """
+    The last write to each row the JSON API syncs (see core.api). SQLite
+    triggers replace an object's row on every write, so ``seq`` only grows
+    and deletions are left behind as tombstones.
+    """
+    seq = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=16)
+    object_id = models.BigIntegerField()
+    # Who may see it: requests only sync to their requester, the rest to everyone
+    user_id = models.BigIntegerField(blank=True, null=True)
+    deleted = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_change_per_object'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'user_id', 'seq'], name='change_sync_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username}'s Profile"
\ No newline at end of file
+        return f"{self.kind} {self.object_id} @ {self.seq}{' (deleted)' if self.deleted else ''}"
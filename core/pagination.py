@@ -0,0 +1,72 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the ``(created_at, pk)`` position encoded in ``cursor``."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}') from e
+
+
+def encode_token(kind, value):
+    """Opaque token for an integer position of ``kind``, such as the last id of a page."""
+    raw = f"{kind}|{value}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token, kind):
+    """Return the integer in ``token``, which must have come from ``encode_token(kind, ...)``."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        token_kind, value = raw.split('|', 1)
+        if token_kind != kind:
+            raise ValueError(f'not a {kind} token')
+        return int(value)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f'Invalid {kind} token: {token!r}') from e
+
+
+def keyset_page(queryset, cursor=None, page_size=20, descending=True):
+    """
+    Return ``(items, next_cursor)`` for the page of ``queryset`` after ``cursor``.
+
+    Rows are ordered on ``(created_at, id)`` and the page is found with a
+    range condition on that pair instead of an OFFSET, so every page costs
+    the same however deep into the listing it is. ``next_cursor`` is None on
+    the last page.
+    """
+    if descending:
+        queryset = queryset.order_by('-created_at', '-id')
+    else:
+        queryset = queryset.order_by('created_at', 'id')
+
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        if descending:
+            after = Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        else:
+            after = Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+        queryset = queryset.filter(after)
+
+    # One extra row tells us whether there is a next page
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].pk)
+    return items, next_cursor
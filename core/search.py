@@ -0,0 +1,61 @@
+"""
+Full-text project search over the ``core_project_search`` FTS5 table.
+
+The table (created in migration 0017) indexes each project's repo path,
+description, desired skill names and README, and SQLite triggers keep it in
+step with every write. Queries are ranked with bm25, weighting repo and skill
+matches above README ones, and come back with a highlighted snippet.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+# bm25 column weights: repo, description, skills, readme
+WEIGHTS = (4.0, 2.0, 3.0, 1.0)
+SNIPPET_TOKENS = 16
+# Private-use markers survive escaping, then become <mark> tags
+_OPEN, _CLOSE = '\ue000', '\ue001'
+
+_TERM = re.compile(r'\w+')
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 MATCH expression, or None if it has no terms.
+
+    Each word is quoted so FTS5 operators in user input are taken literally;
+    the last one also matches as a prefix, for search-as-you-type.
+    """
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms) + '*'
+
+
+def search(query, limit=20, offset=0):
+    """
+    Return ``[(project_id, snippet_html)]`` for the best matches of ``query``,
+    best first.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT rowid, snippet(core_project_search, -1, %s, %s, '…', {SNIPPET_TOKENS})
+            FROM core_project_search
+            WHERE core_project_search MATCH %s
+            ORDER BY bm25(core_project_search, {', '.join(map(str, WEIGHTS))})
+            LIMIT %s OFFSET %s
+            """,
+            [_OPEN, _CLOSE, expression, limit, offset],
+        )
+        rows = cursor.fetchall()
+    return [(project_id, highlight(snippet)) for project_id, snippet in rows]
+
+
+def highlight(snippet):
+    return mark_safe(escape(snippet).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
@@ -0,0 +1,124 @@
+from django.db.models import Sum
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import cache_tags, jobs
+from .counters import Like, adjust_likes, adjust_reputation
+from .models import Comment, ContributorRequest, Profile, Project
+from .skills import skill_index
+
+
+@receiver(m2m_changed, sender=Project.desired_skills.through)
+def desired_skills_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        instance._cleared_projects = set(instance.projects.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        # Forward: instance is a Project and pk_set holds skill ids.
+        # Reverse (skill.projects.add(...)): the other way round.
+        if reverse:
+            pairs = [(instance.pk, project_id) for project_id in pk_set]
+        else:
+            pairs = [(skill_id, instance.pk) for skill_id in pk_set]
+        if action == 'post_add':
+            skill_index.add(pairs)
+        else:
+            skill_index.remove(pairs)
+    elif action == 'post_clear':
+        if reverse:
+            skill_index.invalidate()
+        else:
+            skill_index.drop_project(instance.pk)
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        if not reverse:
+            project_ids = [instance.pk]
+        elif action == 'post_clear':
+            project_ids = instance.__dict__.pop('_cleared_projects', set())
+        else:
+            project_ids = pk_set
+        cache_tags.invalidate(*map(cache_tags.project_tag, project_ids))
+
+
+@receiver(pre_delete, sender=Project)
+def project_deleting(sender, instance, **kwargs):
+    # The cascade removes the likes without an m2m_changed signal
+    like_count = Project.objects.filter(pk=instance.pk).values_list('like_count', flat=True).first()
+    if like_count:
+        adjust_reputation(instance.owner_id, -like_count)
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    skill_index.drop_project(instance.pk)
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def project_changed(sender, instance, **kwargs):
+    # The feed tag covers pages the project joins or leaves
+    cache_tags.invalidate(cache_tags.FEED, cache_tags.project_tag(instance.pk))
+
+
+@receiver(post_save, sender=ContributorRequest)
+@receiver(post_delete, sender=ContributorRequest)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def project_activity(sender, instance, **kwargs):
+    cache_tags.invalidate(cache_tags.project_tag(instance.project_id))
+
+
+@receiver(m2m_changed, sender=Like)
+def likes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # For removals Django passes the requested ids whether or not they were
+    # liked, so look up the rows that really exist before they go.
+    if action in ('pre_remove', 'pre_clear'):
+        likes = Like.objects.filter(user_id=instance.pk) if reverse else Like.objects.filter(project_id=instance.pk)
+        if pk_set is not None:
+            likes = likes.filter(**{'project_id__in' if reverse else 'user_id__in': pk_set})
+        instance._removed_likes = set(likes.values_list('project_id' if reverse else 'user_id', flat=True))
+        return
+    if action == 'post_add':
+        changed, delta = pk_set, 1
+    elif action in ('post_remove', 'post_clear'):
+        changed, delta = instance.__dict__.pop('_removed_likes', set()), -1
+    else:
+        return
+
+    # Forward (project.likes.add(user)): one project, one step per user.
+    # Reverse (user.liked_projects.add(project)): one step per project.
+    if reverse:
+        adjust_likes(changed, delta)
+        cache_tags.invalidate(*map(cache_tags.project_tag, changed))
+    else:
+        adjust_likes([instance.pk], delta * len(changed))
+        cache_tags.invalidate(cache_tags.project_tag(instance.pk))
+
+
+@receiver(post_save, sender=Profile)
+def profile_saved(sender, instance, created, **kwargs):
+    # A profile can be created after the user's projects already have likes
+    if created:
+        reputation = instance.user.projects.aggregate(total=Sum('like_count'))['total'] or 0
+        if reputation:
+            Profile.objects.filter(pk=instance.pk).update(reputation=reputation)
+            instance.reputation = reputation
+    # Cards show the owner's payment links
+    cache_tags.invalidate(cache_tags.user_tag(instance.user_id))
+    if instance.access_token:
+        jobs.resume_invites(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Profile.skills.through)
+def profile_skills_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Reverse (skill.profiles...): pk_set holds profile ids, and for a clear
+    # the rows have to be read before they go.
+    if reverse and action == 'pre_clear':
+        instance._cleared_profiles = set(instance.profiles.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.user_id]
+    else:
+        profile_ids = instance.__dict__.pop('_cleared_profiles', set()) if action == 'post_clear' else pk_set
+        user_ids = Profile.objects.filter(pk__in=profile_ids).values_list('user_id', flat=True)
+    cache_tags.invalidate(*map(cache_tags.user_tag, user_ids))
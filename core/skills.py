@@ -0,0 +1,105 @@
+"""
+Inverted skill index used to match users to projects.
+
+Each process keeps a ``skill id -> set of project ids`` map built from the
+``Project.desired_skills`` through table in one query. Signal handlers apply
+changes to the local copy and bump the ``skills`` cache tag, whose version is
+kept in the database (see ``core.cache_tags``), so other processes notice on
+their next lookup and rebuild their copy.
+"""
+import heapq
+import threading
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from . import cache_tags
+from .models import Project
+
+TAG = 'skills'
+
+
+class SkillIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._projects_by_skill = None
+        self._version = None
+
+    def _shared_version(self):
+        return cache_tags.versions([TAG])[TAG]
+
+    def _load(self):
+        version = self._shared_version()
+        if self._projects_by_skill is None or self._version != version:
+            projects_by_skill = defaultdict(set)
+            rows = Project.desired_skills.through.objects.values_list('skill_id', 'project_id')
+            for skill_id, project_id in rows.iterator(chunk_size=10000):
+                projects_by_skill[skill_id].add(project_id)
+            self._projects_by_skill, self._version = projects_by_skill, version
+        return self._projects_by_skill
+
+    def _changed(self, apply):
+        # Transactions take the database write lock up front, so no other
+        # process can bump the tag between our read and our bump. It is taken
+        # before our own lock: lookups hold that one while reading, and a
+        # writer must not wait for it while others wait for the database.
+        with transaction.atomic(), self._lock:
+            before = self._shared_version()
+            cache_tags.invalidate(TAG)
+            version = self._shared_version()
+            if self._projects_by_skill is not None and self._version == before:
+                # We were current before this change, so patching our own
+                # copy keeps it exact without a rebuild.
+                apply(self._projects_by_skill)
+                self._version = version
+            else:
+                self._projects_by_skill = None
+
+    def add(self, pairs):
+        """Record ``(skill_id, project_id)`` pairs."""
+        def apply(index):
+            for skill_id, project_id in pairs:
+                index[skill_id].add(project_id)
+        self._changed(apply)
+
+    def remove(self, pairs):
+        """Forget ``(skill_id, project_id)`` pairs."""
+        def apply(index):
+            for skill_id, project_id in pairs:
+                index.get(skill_id, set()).discard(project_id)
+        self._changed(apply)
+
+    def drop_project(self, project_id):
+        def apply(index):
+            for project_ids in index.values():
+                project_ids.discard(project_id)
+        self._changed(apply)
+
+    def invalidate(self):
+        """Force every process, this one included, to rebuild on its next lookup."""
+        with self._lock:
+            cache_tags.invalidate(TAG)
+            self._projects_by_skill = None
+
+    @property
+    def version(self):
+        return self._version
+
+    def match(self, skill_ids, limit=None):
+        """
+        Return ``(project_id, overlap)`` pairs for projects wanting any of
+        ``skill_ids``, most shared skills first and newest first among ties.
+        """
+        with self._lock:
+            index = self._load()
+            overlap = Counter()
+            for skill_id in set(skill_ids):
+                overlap.update(index.get(skill_id, ()))
+        ranked = overlap.items()
+        key = lambda item: (item[1], item[0])
+        if limit is None:
+            return sorted(ranked, key=key, reverse=True)
+        return heapq.nlargest(limit, ranked, key=key)
+
+
+skill_index = SkillIndex()
@@ -0,0 +1,11 @@
+from django import template
+
+from core import avatars
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar_url(username, size):
+    """URL of ``username``'s GitHub avatar through the local proxy, at least ``size`` px wide."""
+    return avatars.avatar_url(username, size)
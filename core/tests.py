@@ -1,3 +1,1421 @@
-from django.test import TestCase
+import asyncio
+import base64
+import importlib
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from social_django.models import UserSocialAuth
+
+from . import (
+    avatars, cache_tags, counters, feed, github, github_stub, jobs, markdown_cache, metrics, pagination, search, skills,
+)
+from .models import CacheTag, Comment, ContributorRequest, Job, Profile, Project, RenderedMarkdown, RepoSnapshot, Skill
+
+
+class FetchGitHubDataTests(TestCase):
+    def test_results_for_every_repo(self):
+        with mock.patch.object(github, 'fetch_repo_data', side_effect=lambda link: {'forks_count': len(link)}):
+            results, missed = github.fetch_github_data(['https://github.com/a/b', 'https://github.com/a/bc'])
+        self.assertEqual(missed, set())
+        self.assertEqual(results['https://github.com/a/b'], {'forks_count': 22})
+        self.assertEqual(results['https://github.com/a/bc'], {'forks_count': 23})
+
+    def test_slow_repos_are_reported_as_missed(self):
+        def fetch(link):
+            if link.endswith('slow'):
+                time.sleep(0.5)
+            return {'forks_count': 1}
+
+        with mock.patch.object(github, 'fetch_repo_data', side_effect=fetch):
+            results, missed = github.fetch_github_data(
+                ['https://github.com/a/fast', 'https://github.com/a/slow'], deadline=0.1,
+            )
+        self.assertEqual(missed, {'https://github.com/a/slow'})
+        self.assertEqual(results, {'https://github.com/a/fast': {'forks_count': 1}})
+
+
+class SyncGitHubTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('octo')
+        self.fresh = Project.objects.create(owner=self.owner, repo_link='https://github.com/octo/fresh')
+        self.stale = Project.objects.create(owner=self.owner, repo_link='https://github.com/octo/stale')
+        self.new = Project.objects.create(owner=self.owner, repo_link='https://github.com/octo/new')
+        RepoSnapshot.objects.create(project=self.fresh, fetched_at=timezone.now())
+        RepoSnapshot.objects.create(project=self.stale, fetched_at=timezone.now() - timedelta(days=1))
+
+    def sync(self, **options):
+        call_command('sync_github', stdout=StringIO(), **options)
+
+    def test_refreshes_missing_and_stale_snapshots_only(self):
+        data = {'forks_count': 3, 'default_branch': 'dev', 'readme': '# Hi'}
+        with mock.patch.object(github, 'fetch_repo_data', return_value=data) as fetch:
+            self.sync(batch_size=1)
+        self.assertEqual(
+            sorted(call.args[0] for call in fetch.call_args_list),
+            ['https://github.com/octo/new', 'https://github.com/octo/stale'],
+        )
+        snapshot = RepoSnapshot.objects.get(project=self.new)
+        self.assertEqual((snapshot.forks_count, snapshot.default_branch), (3, 'dev'))
+        self.assertEqual(snapshot.readme_html, '<h1>Hi</h1>')
+        self.assertIsNone(RepoSnapshot.objects.get(project=self.fresh).forks_count)
+
+    def test_home_reads_snapshots_without_calling_github(self):
+        RepoSnapshot.objects.filter(project=self.fresh).update(forks_count=7, readme_html='<p>fresh readme</p>')
+        self.client.force_login(self.owner)
+        with mock.patch.object(github.client.session, 'request') as request:
+            response = self.client.get(reverse('home'))
+        request.assert_not_called()
+        self.assertContains(response, 'fresh readme')
+        self.assertContains(response, 'README not synced from GitHub yet')
+
+
+def fake_response(status_code, content=b'', headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+class GitHubClientTests(TestCase):
+    url = 'https://api.github.com/repos/octo/repo'
+
+    def setUp(self):
+        cache.clear()
+        self.client_ = github.GitHubClient(token='', rate_limit_reserve=10, failure_threshold=2, cooldown=60)
+
+    def test_revalidates_with_etag_and_serves_304_from_cache(self):
+        with mock.patch.object(self.client_.session, 'request', side_effect=[
+            fake_response(200, b'{"forks_count": 1}', {'ETag': '"v1"'}),
+            fake_response(304),
+        ]) as request:
+            self.client_.get(self.url)
+            response = self.client_.get(self.url)
+        self.assertEqual(request.call_args.kwargs['headers']['If-None-Match'], '"v1"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'forks_count': 1})
+
+    def test_serves_stale_data_when_rate_limit_budget_is_spent(self):
+        reset = str(int(time.time()) + 600)
+        with mock.patch.object(self.client_.session, 'request', return_value=fake_response(
+            200, b'{}', {'ETag': '"v1"', 'X-RateLimit-Remaining': '10', 'X-RateLimit-Reset': reset},
+        )) as request:
+            self.client_.get(self.url)
+            response = self.client_.get(self.url)
+            self.assertEqual(request.call_count, 1)
+            self.assertTrue(response.stale)
+            with self.assertRaises(github.GitHubError):
+                self.client_.get(self.url + '/other')
+
+    def test_circuit_opens_after_repeated_failures(self):
+        with mock.patch.object(self.client_.session, 'request', side_effect=requests.ConnectionError) as request:
+            for _ in range(3):
+                with self.assertRaises(github.GitHubError):
+                    self.client_.get(self.url)
+        self.assertEqual(request.call_count, 2)
+
+
+@override_settings(FEED_PAGE_SIZE=3)
+class HomeFeedPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('octo')
+        Profile.objects.create(user=self.user)
+        # Half the projects share a timestamp so the id tie-breaker matters
+        created_at = timezone.now()
+        self.projects = [
+            Project.objects.create(owner=self.user, repo_link=f'https://github.com/octo/repo{i}')
+            for i in range(7)
+        ]
+        Project.objects.filter(id__in=[p.id for p in self.projects[:4]]).update(created_at=created_at)
+        self.client.force_login(self.user)
+
+    def test_cursor_walks_every_project_once_newest_first(self):
+        seen, cursor = [], None
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            data = self.client.get(reverse('home_feed'), params).json()
+            self.assertLessEqual(len(data['projects']), 3)
+            seen += [p['id'] for p in data['projects']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        expected = Project.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_home_renders_first_page_and_html_fragment_continues_it(self):
+        response = self.client.get(reverse('home'))
+        self.assertEqual(len(response.context['projects']), 3)
+        cursor = response.context['next_cursor']
+        fragment = self.client.get(reverse('home_feed'), {'cursor': cursor, 'format': 'html'})
+        self.assertEqual(len(fragment.context['projects']), 3)
+        self.assertIn('X-Next-Cursor', fragment)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('home_feed'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(FEED_PAGE_SIZE=2)
+class CacheTagInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        self.profile = Profile.objects.create(user=self.owner)
+        self.old, self.middle, self.new = (
+            Project.objects.create(owner=self.owner, repo_link=f'https://github.com/owner/{name}')
+            for name in ('old', 'middle', 'new')
+        )
+        self.fan = User.objects.create_user('fan')
+
+    def first_page(self):
+        return {p.id: p for p in feed.feed_page()['projects']}
+
+    def assertServedFromCache(self):
+        # Only the tag versions are read from the database
+        with self.assertNumQueries(1):
+            return self.first_page()
+
+    def test_first_page_is_cached_until_something_on_it_changes(self):
+        self.first_page()
+        self.assertServedFromCache()
+
+        # Off the page: the cached entry survives
+        self.old.likes.add(self.fan)
+        Comment.objects.create(project=self.old, user=self.fan, text='hi')
+        self.assertServedFromCache()
+
+        self.new.likes.add(self.fan)
+        self.assertEqual(self.first_page()[self.new.id].like_count, 1)
+
+        ContributorRequest.objects.create(project=self.middle, requester=self.fan)
+        self.assertEqual(feed.feed_page()['project_requests'][self.middle.id][0]['username'], 'fan')
+
+        self.profile.paypal = 'https://paypal.me/owner'
+        self.profile.save()
+        self.assertNotIn(self.old.id, self.first_page())
+
+    def test_new_and_deleted_projects_show_immediately(self):
+        self.first_page()
+        newest = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/newest')
+        self.assertEqual(list(self.first_page()), [newest.id, self.new.id])
+        newest.delete()
+        self.assertEqual(list(self.first_page()), [self.new.id, self.middle.id])
+
+    def test_bulk_updates_invalidate_explicitly(self):
+        self.first_page()
+        cache_tags.invalidate(cache_tags.project_tag(self.middle.id))
+        self.first_page()
+        cache_tags.invalidate(cache_tags.project_tag(self.old.id))
+        self.assertServedFromCache()
+
+    def test_bumps_from_other_processes_invalidate(self):
+        self.first_page()
+        # Another worker, with a cache of its own, bumps the tag
+        with mock.patch.object(cache_tags, 'cache', LocMemCache('other-process', {})):
+            self.new.description = 'changed elsewhere'
+            self.new.save()
+        self.assertEqual(self.first_page()[self.new.id].description, 'changed elsewhere')
+
+    def test_change_while_building_is_not_cached_as_current(self):
+        real_assemble = feed.assemble
+
+        def assemble_then_change(projects):
+            requesters = real_assemble(projects)
+            self.new.likes.add(self.fan)
+            return requesters
+
+        with mock.patch.object(feed, 'assemble', assemble_then_change):
+            self.assertEqual(self.first_page()[self.new.id].like_count, 0)
+        self.assertEqual(self.first_page()[self.new.id].like_count, 1)
+
+
+class CacheStampedeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return f'v{self.builds}', cache_tags.versions(['project:1'])
+
+    def lookup(self):
+        return cache_tags.get_or_build('page', self.build)
+
+    def expire_softly(self):
+        entry = cache.get('page')
+        entry['fresh_until'] = 0
+        cache.set('page', entry)
+
+    def test_soft_expiry_serves_stale_and_refreshes_in_the_background(self):
+        self.lookup()
+        self.expire_softly()
+        with mock.patch.object(cache_tags._refresher, 'submit') as submit:
+            self.assertEqual(self.lookup(), 'v1')
+            self.assertEqual(self.lookup(), 'v1')  # refresh already in flight
+        self.assertEqual(submit.call_count, 1)
+        cache_tags._refresh(*submit.call_args.args[1:])
+        self.assertEqual(self.lookup(), 'v2')
+        self.assertEqual(
+            cache_tags.stats('page'),
+            {'hit': 1, 'stale': 2, 'miss': 1, 'wait': 0, 'refresh': 1, 'error': 0},
+        )
+
+    def test_only_the_lock_holder_rebuilds_after_invalidation(self):
+        self.lookup()
+        cache_tags.invalidate('project:1')
+        cache.add('page:lock', 1)  # another request is rebuilding
+        self.assertEqual(self.lookup(), 'v1')
+        cache.delete('page:lock')
+        self.assertEqual(self.lookup(), 'v2')
+        self.assertEqual(self.builds, 2)
+
+    def test_cold_misses_wait_for_the_builder(self):
+        cache.add('page:lock', 1)
+
+        def sleep(seconds):
+            cache.set('page', {'value': 'built elsewhere', 'tags': {}, 'fresh_until': time.time() + 60})
+
+        with mock.patch.object(cache_tags.time, 'sleep', side_effect=sleep):
+            self.assertEqual(self.lookup(), 'built elsewhere')
+        self.assertEqual(self.builds, 0)
+        self.assertEqual(cache_tags.stats('page')['wait'], 1)
+
+
+class CardFragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        Profile.objects.create(user=self.owner)
+        self.projects = [
+            Project.objects.create(owner=self.owner, repo_link=f'https://github.com/owner/repo{i}')
+            for i in range(3)
+        ]
+        self.viewer = User.objects.create_user('viewer')
+        self.client.force_login(self.viewer)
+
+    def rendered_cards(self):
+        with mock.patch.object(feed, 'render_to_string', wraps=feed.render_to_string) as render:
+            response = self.client.get(reverse('home'))
+        return response, [call.args[1]['project'].id for call in render.call_args_list]
+
+    def test_only_changed_cards_are_rendered_again(self):
+        _, rendered = self.rendered_cards()
+        self.assertEqual(len(rendered), 3)
+        _, rendered = self.rendered_cards()
+        self.assertEqual(rendered, [])
+
+        self.projects[1].likes.add(self.owner)
+        ContributorRequest.objects.create(project=self.projects[2], requester=self.owner)
+        response, rendered = self.rendered_cards()
+        self.assertEqual(sorted(rendered), [self.projects[1].id, self.projects[2].id])
+        self.assertContains(response, 'title="owner"')
+
+    def test_liked_state_is_per_viewer(self):
+        self.rendered_cards()
+        self.projects[0].likes.add(self.viewer)
+        response, _ = self.rendered_cards()
+        self.assertContains(response, 'class="project-card is-liked"', count=1)
+        self.client.force_login(self.owner)
+        response, _ = self.rendered_cards()
+        self.assertNotContains(response, 'is-liked"')
+
+
+class FeedAssemblyQueryCountTests(TestCase):
+    def make_projects(self, count):
+        owners = User.objects.bulk_create([User(username=f'owner{i}') for i in range(count)])
+        Profile.objects.bulk_create([Profile(user=owner, paypal='https://paypal.me/x') for owner in owners])
+        requesters = User.objects.bulk_create([User(username=f'requester{i}') for i in range(7)])
+        skill, _ = Skill.objects.get_or_create(name='Python')
+        projects = Project.objects.bulk_create([
+            Project(owner=owner, repo_link=f'https://github.com/{owner.username}/repo', paypal=True)
+            for owner in owners
+        ])
+        Project.desired_skills.through.objects.bulk_create([
+            Project.desired_skills.through(project=project, skill=skill) for project in projects
+        ])
+        Project.likes.through.objects.bulk_create([
+            Project.likes.through(project=project, user=requesters[0]) for project in projects
+        ])
+        ContributorRequest.objects.bulk_create([
+            ContributorRequest(project=project, requester=requester)
+            for project in projects for requester in requesters
+        ])
+        counters.reconcile()
+
+    def assemble_page(self):
+        projects = list(feed.feed_queryset())
+        project_requests = feed.assemble(projects)
+        return [feed.project_json(p, project_requests) for p in projects]
+
+    def test_query_count_does_not_grow_with_projects(self):
+        self.make_projects(10)
+        with CaptureQueriesContext(connection) as small:
+            cards = self.assemble_page()
+        self.assertEqual(len(cards), 10)
+        self.assertEqual(len(cards[0]['requests']), feed.REQUESTERS_PER_PROJECT)
+        self.assertEqual(cards[0]['like_count'], 1)
+        self.assertEqual(cards[0]['desired_skills'], ['Python'])
+
+        User.objects.all().delete()
+        self.make_projects(1000)
+        with self.assertNumQueries(len(small.captured_queries)):
+            cards = self.assemble_page()
+        self.assertEqual(len(cards), 1000)
+
+    def test_requesters_are_the_first_five_pending_ones(self):
+        self.make_projects(1)
+        project = Project.objects.get()
+        ContributorRequest.objects.filter(project=project, requester__username='requester1').update(status='accepted')
+        requests_by_project = feed.pending_requesters([project.id])
+        self.assertEqual(
+            [r['username'] for r in requests_by_project[project.id]],
+            ['requester0', 'requester2', 'requester3', 'requester4', 'requester5'],
+        )
+
+
+class SkillMatchingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('octo')
+        self.profile = Profile.objects.create(user=self.user)
+        self.python, self.django, self.rust = (
+            Skill.objects.create(name=name) for name in ('Python', 'Django', 'Rust')
+        )
+        owner = User.objects.create_user('owner')
+        self.one = Project.objects.create(owner=owner, repo_link='https://github.com/owner/one')
+        self.both = Project.objects.create(owner=owner, repo_link='https://github.com/owner/both')
+        self.other = Project.objects.create(owner=owner, repo_link='https://github.com/owner/other')
+        self.one.desired_skills.add(self.python)
+        self.both.desired_skills.add(self.python, self.django)
+        self.other.desired_skills.add(self.rust)
+
+    def matched(self):
+        projects, _ = feed.matched_projects(self.user)
+        return [(p, p.skill_overlap) for p in projects]
+
+    def test_ranked_by_overlap(self):
+        self.profile.skills.add(self.python, self.django)
+        self.assertEqual(self.matched(), [(self.both, 2), (self.one, 1)])
+
+    def test_profile_skill_edits_apply_immediately(self):
+        self.profile.skills.add(self.python)
+        self.assertEqual(self.matched(), [(self.both, 1), (self.one, 1)])
+        self.profile.skills.set([self.rust])
+        self.assertEqual(self.matched(), [(self.other, 1)])
+
+    def test_project_skill_edits_apply_immediately(self):
+        self.profile.skills.add(self.rust)
+        self.assertEqual(self.matched(), [(self.other, 1)])
+        self.one.desired_skills.add(self.rust)
+        self.other.desired_skills.clear()
+        self.assertEqual(self.matched(), [(self.one, 1)])
+        self.rust.projects.add(self.both)
+        self.one.delete()
+        self.assertEqual(self.matched(), [(self.both, 1)])
+
+    def test_other_processes_rebuild_after_a_change(self):
+        self.profile.skills.add(self.rust)
+        other_process = skills.SkillIndex()
+        self.assertEqual(other_process.match([self.rust.id]), [(self.other.id, 1)])
+        self.both.desired_skills.add(self.rust)
+        cache.clear()  # the version is not in the cache, which may be per process
+        self.assertEqual(other_process.match([self.rust.id]), [(self.other.id, 1), (self.both.id, 1)])
+
+    def test_local_copy_is_patched_when_current(self):
+        skills.skill_index.match([self.rust.id])
+        self.both.desired_skills.add(self.rust)
+        with self.assertNumQueries(1):  # just the version check
+            self.assertEqual(skills.skill_index.match([self.rust.id]), [(self.other.id, 1), (self.both.id, 1)])
+
+
+class LikeCounterTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        self.profile = Profile.objects.create(user=self.owner)
+        self.fans = [User.objects.create_user(f'fan{i}') for i in range(3)]
+        self.project = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/a')
+        self.other = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/b')
+
+    def assertCounters(self, project_likes, other_likes):
+        self.assertEqual(Project.objects.get(pk=self.project.pk).like_count, project_likes)
+        self.assertEqual(Project.objects.get(pk=self.other.pk).like_count, other_likes)
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).reputation, project_likes + other_likes)
+
+    def test_counters_follow_likes_from_both_sides(self):
+        self.project.likes.add(*self.fans)
+        self.project.likes.add(self.fans[0])  # already liked
+        self.fans[0].liked_projects.add(self.other)
+        self.assertCounters(3, 1)
+        self.project.likes.remove(self.fans[0], self.owner)  # owner never liked it
+        self.fans[1].liked_projects.clear()
+        self.assertCounters(1, 1)
+        self.project.likes.clear()
+        self.assertCounters(0, 1)
+
+    def test_deleting_a_project_lowers_reputation(self):
+        self.project.likes.add(*self.fans)
+        self.other.likes.add(self.fans[0])
+        Project.objects.get(pk=self.project.pk).delete()
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).reputation, 1)
+
+    def test_reputation_costs_no_queries(self):
+        self.project.likes.add(*self.fans)
+        profile = Profile.objects.get(pk=self.profile.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(profile.reputation_score(), 3)
+
+    def test_reconcile_repairs_drift(self):
+        Project.likes.through.objects.bulk_create([
+            Project.likes.through(project=self.project, user=fan) for fan in self.fans
+        ])
+        Profile.objects.filter(pk=self.profile.pk).update(reputation=99)
+        tags = [cache_tags.project_tag(self.project.pk), cache_tags.user_tag(self.owner.pk)]
+        before = cache_tags.versions(tags)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Fixed 1 project like count(s) and 1 reputation score(s)', out.getvalue())
+        self.assertCounters(3, 0)
+        # Cached cards showing the old counts are dropped
+        after = cache_tags.versions(tags)
+        self.assertTrue(all(after[tag] != before[tag] for tag in tags))
+
+
+class ToggleLikeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        self.profile = Profile.objects.create(user=self.owner)
+        self.project = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/a')
+        self.fan = User.objects.create_user('fan')
+        self.client.force_login(self.fan)
+        self.url = reverse('toggle_like', args=[self.project.id])
+
+    def toggle(self):
+        return self.client.post(self.url, headers={'X-Requested-With': 'XMLHttpRequest'})
+
+    def test_toggles_and_returns_the_count_without_counting(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.toggle().json(), {'liked': True, 'like_count': 1})
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql']])
+        self.assertEqual(self.toggle().json(), {'liked': False, 'like_count': 0})
+        self.assertEqual(self.toggle().json(), {'liked': True, 'like_count': 1})
+        self.assertEqual(Profile.objects.get(pk=self.profile.pk).reputation, 1)
+        self.assertEqual(list(self.project.likes.all()), [self.fan])
+
+    def test_unknown_project_and_form_fallback(self):
+        response = self.client.post(reverse('toggle_like', args=[self.project.id + 1]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(reverse('project_detail', args=[self.project.id]), {'like': 'true'})
+        self.assertRedirects(response, reverse('project_detail', args=[self.project.id]))
+        self.assertEqual(Project.objects.get(pk=self.project.pk).like_count, 1)
+
+    def test_a_concurrent_insert_is_not_counted_twice(self):
+        Project.likes.through.objects.create(project=self.project, user=self.fan)
+        with mock.patch.object(counters.Like.objects, 'filter') as filter_:
+            # Our delete found nothing: the other click's insert landed in between
+            filter_.return_value.delete.return_value = (0, {})
+            self.assertEqual(counters.toggle_like(self.project.id, self.fan.id), (True, 0))
+
+
+class SQLiteTuningTests(TestCase):
+    def test_connections_get_the_configured_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -20000)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_benchmark_compares_default_and_tuned_profiles(self):
+        out = StringIO()
+        call_command('bench_sqlite', clients=2, ops=5, projects=1, stdout=out)
+        rows = {line.split()[0]: line.split() for line in out.getvalue().splitlines()[2:]}
+        self.assertEqual(set(rows), {'default', 'tuned'})
+        self.assertEqual(rows['tuned'][3], '0')  # no "database is locked" errors
+
+
+@override_settings(COMMENTS_PAGE_SIZE=3)
+class ProjectDetailTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        self.project = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/a')
+        self.viewer = User.objects.create_user('viewer')
+        self.client.force_login(self.viewer)
+        self.url = reverse('project_detail', args=[self.project.id])
+
+    def add_activity(self, count, prefix):
+        users = User.objects.bulk_create([User(username=f'{prefix}{i}') for i in range(count)])
+        self.project.likes.add(*users)
+        Comment.objects.bulk_create([Comment(project=self.project, user=user, text='hi') for user in users])
+
+    def test_query_count_does_not_grow_with_likes_or_comments(self):
+        self.add_activity(2, 'a')
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(self.url)
+        self.add_activity(30, 'b')
+        with self.assertNumQueries(len(few.captured_queries)):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['comments']), 3)
+        self.assertFalse(response.context['project'].liked_by_me)
+        self.assertContains(response, '<span class="like-count" style="font-size: 1.1rem;">32</span>', html=False)
+
+    def test_new_comment_is_shown_after_posting(self):
+        self.add_activity(7, 'c')
+        response = self.client.post(self.url, {'comment': 'just posted'}, follow=True)
+        self.assertEqual(response.context['comments'][-1].text, 'just posted')
+
+    def test_liked_by_me(self):
+        self.project.likes.add(self.viewer)
+        self.assertTrue(self.client.get(self.url).context['project'].liked_by_me)
+
+    def test_load_earlier_walks_every_comment_in_order(self):
+        self.add_activity(7, 'c')
+        response = self.client.get(self.url)
+        seen = [c.id for c in response.context['comments']]
+        cursor = response.context['next_cursor']
+        while cursor:
+            fragment = self.client.get(reverse('project_comments', args=[self.project.id]), {'cursor': cursor})
+            # Earlier pages go above the ones shown
+            seen = [c.id for c in fragment.context['comments']] + seen
+            cursor = fragment.get('X-Next-Cursor')
+        self.assertEqual(seen, list(Comment.objects.order_by('created_at', 'id').values_list('id', flat=True)))
+        bad = self.client.get(reverse('project_comments', args=[self.project.id]), {'cursor': 'nope'})
+        self.assertEqual(bad.status_code, 400)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        self.python = Skill.objects.create(name='Python')
+        self.parser = Project.objects.create(
+            owner=self.owner, repo_link='https://github.com/owner/fast-parser', description='A streaming JSON parser',
+        )
+        self.website = Project.objects.create(
+            owner=self.owner, repo_link='https://github.com/owner/website', description='Personal site',
+        )
+        RepoSnapshot.objects.create(project=self.website, readme='Built with <b>Django</b> and a JSON API.')
+        self.client.force_login(self.owner)
+
+    def ids(self, query):
+        return [project_id for project_id, _ in search.search(query)]
+
+    def test_ranks_stronger_fields_first_and_matches_prefixes(self):
+        self.assertEqual(self.ids('json'), [self.parser.id, self.website.id])
+        self.assertEqual(self.ids('pars'), [self.parser.id])
+        self.assertEqual(self.ids('fast parser'), [self.parser.id])
+        self.assertEqual(self.ids('streams'), [self.parser.id])  # porter stemming
+
+    def test_snippets_are_escaped_and_highlighted(self):
+        [(_, snippet)] = search.search('django')
+        self.assertIn('&lt;b&gt;<mark>Django</mark>&lt;/b&gt;', snippet)
+
+    def test_index_follows_every_write_path(self):
+        Project.objects.filter(pk=self.website.pk).update(description='Rust game engine')
+        self.assertEqual(self.ids('engine'), [self.website.id])
+        self.website.desired_skills.add(self.python)
+        self.assertEqual(self.ids('python'), [self.website.id])
+        self.python.name = 'Haskell'
+        self.python.save()
+        self.assertEqual(self.ids('python'), [])
+        self.assertEqual(self.ids('haskell'), [self.website.id])
+        snapshot = RepoSnapshot.objects.get(project=self.website)
+        snapshot.readme = 'Now about kites'
+        RepoSnapshot.objects.bulk_update([snapshot], ['readme'])
+        self.assertEqual(self.ids('django'), [])
+        self.assertEqual(self.ids('kites'), [self.website.id])
+        self.website.delete()
+        self.assertEqual(self.ids('kites'), [])
+
+    def test_view_tolerates_query_syntax_and_pages(self):
+        for query in ['', '"', 'json OR', 'NEAR(', 'c++ -x']:
+            self.assertEqual(self.client.get(reverse('search'), {'q': query}).status_code, 200)
+        with override_settings(SEARCH_PAGE_SIZE=1):
+            response = self.client.get(reverse('search'), {'q': 'json'})
+            self.assertEqual([p.id for p, _ in response.context['results']], [self.parser.id])
+            self.assertEqual(response.context['next_page'], 2)
+            response = self.client.get(reverse('search'), {'q': 'json', 'page': 2})
+            self.assertEqual([p.id for p, _ in response.context['results']], [self.website.id])
+            self.assertIsNone(response.context['next_page'])
+
+    def test_page_numbers_past_the_last_page_are_clamped(self):
+        with override_settings(SEARCH_PAGE_SIZE=1, SEARCH_MAX_PAGE=1):
+            response = self.client.get(reverse('search'), {'q': 'json', 'page': '99999999999999999999'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([p.id for p, _ in response.context['results']], [self.parser.id])
+            self.assertIsNone(response.context['next_page'])
+
+
+class QueryPlanTests(TestCase):
+    """Hot paths must be served by indexes: EXPLAIN every query they run."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        Profile.objects.create(user=self.owner)
+        self.project = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/a')
+        self.requester = User.objects.create_user('requester')
+        ContributorRequest.objects.create(project=self.project, requester=self.requester)
+        Comment.objects.create(project=self.project, user=self.requester, text='hi')
+        # Skills on both sides, so the feed builds and uses the skill index
+        python = Skill.objects.create(name='Python')
+        self.project.desired_skills.add(python)
+        Profile.objects.create(user=self.requester).skills.add(python)
+
+    def full_scans(self, queries):
+        scans = []
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                subqueries = set()
+                for *_, detail in cursor.fetchall():
+                    # "SCAN t USING INDEX i" walks an index in order and stops at
+                    # the LIMIT; a bare "SCAN t" reads the whole table, whether
+                    # it's named or aliased (U0, ...). Scanning a subquery's
+                    # output (its own plan lines are checked too) or a constant
+                    # row reads no table.
+                    words = detail.split()
+                    if words[0] in ('CO-ROUTINE', 'MATERIALIZE'):
+                        subqueries.add(words[1])
+                    indexed = 'USING' in words or 'VIRTUAL' in words  # FTS5 lookups are virtual table scans
+                    no_table = words[1] in subqueries or words[1].startswith('(') or words[1:3] == ['CONSTANT', 'ROW']
+                    if words[0] == 'SCAN' and not indexed and not no_table:
+                        scans.append(f'{detail}\n    in {sql}')
+        return scans
+
+    def assertIndexed(self, run, full_reads=()):
+        """Assert ``run`` scans no table except ``full_reads``, which it must read whole."""
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        scans = self.full_scans(queries.captured_queries)
+        unexpected = [scan for scan in scans if scan.split()[1] not in full_reads]
+        self.assertFalse(unexpected, 'Full table scans:\n' + '\n'.join(unexpected))
+        for table in full_reads:
+            self.assertTrue([scan for scan in scans if scan.split()[1] == table], f'No full read of {table}')
+
+    def test_feed(self):
+        self.client.force_login(self.requester)
+        # Building the skill index reads the through table whole, once per change
+        skills.skill_index.invalidate()
+        self.assertIndexed(lambda: self.client.get(reverse('home')), full_reads=['core_project_desired_skills'])
+        cache.clear()
+        self.assertIndexed(lambda: self.client.get(reverse('home')))
+        cursor = pagination.encode_cursor(timezone.now(), self.project.id + 1)
+        self.assertIndexed(lambda: self.client.get(reverse('home_feed'), {'cursor': cursor}))
+
+    def test_project_detail_and_writes(self):
+        self.client.force_login(self.requester)
+        url = reverse('project_detail', args=[self.project.id])
+        self.assertIndexed(lambda: self.client.get(url))
+        self.assertIndexed(lambda: self.client.post(url, {'request_join': '1'}))
+        self.assertIndexed(lambda: self.client.post(reverse('toggle_like', args=[self.project.id])))
+
+    def test_manage_requests(self):
+        self.client.force_login(self.owner)
+        self.assertIndexed(lambda: self.client.get(reverse('manage_requests')))
+
+    def test_search(self):
+        self.client.force_login(self.requester)
+        self.assertIndexed(lambda: self.client.get(reverse('search'), {'q': 'owner'}))
+
+    def test_api(self):
+        self.client.force_login(self.requester)
+        token = pagination.encode_token('seq', 0)
+        for name in ('api_projects', 'api_requests'):
+            self.assertIndexed(lambda: self.client.get(reverse(name)))
+            self.assertIndexed(lambda: self.client.get(reverse(name), {'changes_since': token}))
+
+    def test_background_work(self):
+        self.assertIndexed(lambda: jobs.claim(50))
+        with mock.patch('core.management.commands.sync_github.fetch_github_data', return_value=({}, set())):
+            self.assertIndexed(lambda: call_command('sync_github', stdout=StringIO()))
+
+
+class DuplicateRequestTests(TestCase):
+    def test_one_request_per_user_and_project(self):
+        owner, requester = User.objects.create_user('owner'), User.objects.create_user('requester')
+        project = Project.objects.create(owner=owner, repo_link='https://github.com/owner/a')
+        self.client.force_login(requester)
+        url = reverse('project_detail', args=[project.id])
+        self.client.post(url, {'request_join': '1'})
+        response = self.client.post(url, {'request_join': '1'}, follow=True)
+        self.assertContains(response, 'You have already requested to join this project')
+        self.assertEqual(ContributorRequest.objects.count(), 1)
+        with self.assertRaises(IntegrityError):
+            ContributorRequest.objects.create(project=project, requester=requester)
+
+
+class MarkdownCacheTests(TestCase):
+    def setUp(self):
+        markdown_cache._local.clear()
+
+    def test_same_source_is_parsed_once(self):
+        with mock.patch.object(markdown_cache.markdown, 'markdown', wraps=markdown_cache.markdown.markdown) as parse:
+            first = markdown_cache.render_markdown('# Title\n\n' + 'word ' * 50)
+            markdown_cache._local.clear()  # as seen from another process
+            second = markdown_cache.render_markdown('# Title\n\n' + 'word ' * 50)
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(first.html, second.html)
+        self.assertTrue(first.preview.startswith('<h1>Title</h1>'))
+        self.assertIn('…', first.preview)
+
+    @override_settings(MARKDOWN_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_rows_are_evicted(self):
+        markdown_cache.render_markdown('one')
+        markdown_cache.render_markdown('two')
+        RenderedMarkdown.objects.filter(digest=markdown_cache.digest('two')).update(
+            last_used_at=timezone.now() - timedelta(days=1),
+        )
+        markdown_cache.render_markdown('three')
+        self.assertEqual(
+            set(RenderedMarkdown.objects.values_list('digest', flat=True)),
+            {markdown_cache.digest('one'), markdown_cache.digest('three')},
+        )
+
+
+class ManageRequestsReadmeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        project = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/a')
+        for name in ('alice', 'bob'):
+            ContributorRequest.objects.create(project=project, requester=User.objects.create_user(name))
+        Profile.objects.create(user=User.objects.get(username='bob'), readme='Bob imported README')
+        self.client.force_login(self.owner)
+
+    def test_readmes_are_fetched_in_the_view_then_served_from_cache(self):
+        readme = {'content': base64.b64encode(b'Hi, I am Alice').decode()}
+        with mock.patch.object(github.client.session, 'request', return_value=fake_response(
+            200, json.dumps(readme).encode(),
+        )) as request:
+            response = self.client.get(reverse('manage_requests'))
+            self.assertEqual(request.call_count, 1)  # bob's README is stored locally
+            self.assertContains(response, 'README: Hi, I am Alice')
+            self.assertContains(response, 'README: Bob imported README')
+
+            self.client.get(reverse('manage_requests'))
+            self.assertEqual(request.call_count, 1)
+
+    def test_github_errors_are_not_cached(self):
+        readme = {'content': base64.b64encode(b'Hi, I am Alice').decode()}
+        with mock.patch.object(github.client.session, 'request', side_effect=[
+            fake_response(502), fake_response(200, json.dumps(readme).encode()),
+        ]):
+            self.assertContains(self.client.get(reverse('manage_requests')), 'README: Error fetching README')
+            self.assertContains(self.client.get(reverse('manage_requests')), 'README: Hi, I am Alice')
+
+
+class BulkManageRequestsTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        Profile.objects.create(user=self.owner, access_token='t' * 40)
+        self.project = Project.objects.create(
+            owner=self.owner, repo_link='https://github.com/owner/a', contributors_needed=1,
+        )
+        stranger_project = Project.objects.create(
+            owner=User.objects.create_user('stranger'), repo_link='https://github.com/stranger/b',
+        )
+        self.requests = {}
+        for name in ('alice', 'bob', 'carol'):
+            user = User.objects.create_user(name)
+            UserSocialAuth.objects.create(user=user, provider='github', uid=name, extra_data={'login': f'gh-{name}'})
+            self.requests[name] = ContributorRequest.objects.create(project=self.project, requester=user)
+        self.foreign = ContributorRequest.objects.create(project=stranger_project, requester=self.owner)
+        self.client.force_login(self.owner)
+
+    def post(self, decisions):
+        return self.client.post(
+            reverse('bulk_manage_requests'), {'decisions': decisions}, content_type='application/json',
+        )
+
+    def test_applies_decisions_and_queues_invites(self):
+        with mock.patch.object(github.client.session, 'request') as request:
+            response = self.post([
+                {'request_id': self.requests['alice'].id, 'action': 'accept'},
+                {'request_id': self.requests['bob'].id, 'action': 'accept'},
+                {'request_id': self.requests['carol'].id, 'action': 'reject'},
+                {'request_id': self.foreign.id, 'action': 'accept'},
+            ])
+        request.assert_not_called()
+        results = {r['request_id']: r for r in response.json()['results']}
+        self.assertEqual(results[self.requests['alice'].id]['invite']['status'], 'queued')
+        self.assertEqual(results[self.requests['carol'].id]['status'], 'rejected')
+        self.assertEqual(results[self.foreign.id]['status'], 'not_found')
+        self.assertEqual(
+            sorted(job.payload['username'] for job in Job.objects.all()), ['gh-alice', 'gh-bob'],
+        )
+        self.assertEqual(
+            dict(ContributorRequest.objects.filter(project=self.project).values_list('requester__username', 'status')),
+            {'alice': 'accepted', 'bob': 'accepted', 'carol': 'rejected'},
+        )
+        self.assertEqual(ContributorRequest.objects.get(pk=self.foreign.pk).status, 'pending')
+        # Two accepted against one open slot clamps at zero
+        self.assertEqual(Project.objects.get(pk=self.project.pk).contributors_needed, 0)
+
+    def test_rejects_malformed_body(self):
+        self.assertEqual(self.post('nope').status_code, 400)
+
+
+class InviteJobTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        self.profile = Profile.objects.create(user=self.owner, access_token='t' * 40)
+        self.project = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/a')
+        requester = User.objects.create_user('alice')
+        UserSocialAuth.objects.create(user=requester, provider='github', uid='1', extra_data={'login': 'gh-alice'})
+        self.req = ContributorRequest.objects.create(project=self.project, requester=requester)
+        self.client.force_login(self.owner)
+
+    def accept(self):
+        return self.client.post(reverse('manage_requests'), {'request_id': self.req.id, 'action': 'accept'})
+
+    def run_jobs(self, *responses):
+        with mock.patch.object(github.client.session, 'request', side_effect=list(responses)) as request:
+            jobs.run_pending(concurrency=1)
+        return request
+
+    def test_accepting_queues_one_invite_without_calling_github(self):
+        with mock.patch.object(github.client.session, 'request') as request:
+            response = self.accept()
+            self.accept()
+        request.assert_not_called()
+        self.assertContains(response, 'invite for gh-alice is queued')
+        job = Job.objects.get()
+        self.assertEqual(job.idempotency_key, jobs.invite_job_key(self.project.id, self.req.requester_id))
+        self.assertEqual(ContributorRequest.objects.get(pk=self.req.pk).status, 'accepted')
+
+    def test_worker_sends_invite_and_owner_sees_it(self):
+        self.accept()
+        request = self.run_jobs(fake_response(201))
+        self.assertTrue(request.call_args.args[1].endswith('/repos/owner/a/collaborators/gh-alice'))
+        self.assertEqual(Job.objects.get().status, 'succeeded')
+        response = self.client.get(reverse('manage_requests'))
+        self.assertContains(response, 'Successfully invited gh-alice as a collaborator.')
+
+    def test_transient_failures_back_off_then_die(self):
+        self.accept()
+        self.run_jobs(fake_response(502, b'{}'))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ('retrying', 1))
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=20))
+
+        # Not due yet, so nothing runs
+        self.run_jobs().assert_not_called()
+
+        Job.objects.update(run_after=timezone.now(), attempts=job.max_attempts - 1)
+        self.run_jobs(fake_response(502, b'{}'))
+        self.assertEqual(Job.objects.get().status, 'dead')
+
+    def test_client_errors_are_dead_letters_and_can_be_requeued(self):
+        self.accept()
+        self.run_jobs(fake_response(404, b'{"message": "Not Found"}'))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.last_error), ('dead', 'GitHub API Error 404: Not Found'))
+        job = jobs.enqueue_invite(self.req, 'gh-alice')
+        self.assertEqual((job.status, job.attempts), ('queued', 0))
+
+    def test_forbidden_is_permanent_unless_rate_limited(self):
+        self.accept()
+        self.run_jobs(fake_response(403, b'{"message": "API rate limit exceeded"}', {'X-RateLimit-Remaining': '0'}))
+        self.assertEqual(Job.objects.get().status, 'retrying')
+        Job.objects.update(run_after=timezone.now())
+        self.run_jobs(fake_response(403, b'{"message": "Must have admin rights to Repository."}'))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.last_error), ('dead', 'GitHub API Error 403: Must have admin rights to Repository.'))
+
+    def test_missing_token_waits_for_the_owner(self):
+        Profile.objects.filter(pk=self.profile.pk).update(access_token='')
+        self.accept()
+        # However long the owner takes, the job neither retries nor dies
+        for _ in range(Job.objects.get().max_attempts + 1):
+            Job.objects.update(run_after=timezone.now())
+            self.run_jobs().assert_not_called()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('waiting', 0, jobs.WAITING_FOR_TOKEN))
+
+        self.client.post(reverse('profile'), {'access_token': 't' * 40})
+        self.assertEqual(Job.objects.get().status, 'queued')
+        self.run_jobs(fake_response(201))
+        self.assertEqual(Job.objects.get().status, 'succeeded')
+
+    def test_invites_that_died_waiting_are_resumed(self):
+        Profile.objects.filter(pk=self.profile.pk).update(access_token='')
+        self.accept()
+        Job.objects.update(status='dead', attempts=6, last_error=jobs.WAITING_FOR_TOKEN)
+        self.profile.access_token = 't' * 40
+        self.profile.save()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ('queued', 0))
+
+
+class BenchmarkToolsTests(TestCase):
+    def test_github_client_talks_to_the_stub(self):
+        with github_stub.GitHubStub() as stub, \
+                override_settings(GITHUB_API_URL=stub.api_url, GITHUB_RAW_URL=stub.raw_url):
+            cache.clear()
+            data = github.fetch_repo_data('https://github.com/octo/repo')
+            self.assertEqual(data['default_branch'], 'main')
+            self.assertIn('# repo', data['readme'])
+            self.assertEqual(github.fetch_readme_gist('octo')[:6], '# octo')
+            self.assertEqual(github.invite_collaborator('https://github.com/octo/repo', 'fan', 't' * 40)[2], 201)
+        self.assertEqual(stub.counts, {'repo': 1, 'raw_readme': 1, 'profile_readme': 1, 'invite': 1})
+
+    def test_seed_then_benchmark_every_view(self):
+        out = StringIO()
+        call_command('seed_bench', size='30', stdout=out)
+        self.assertIn('30 projects', out.getvalue())
+        self.assertEqual(Project.objects.count(), 30)
+        # Bulk inserts skip the signals; the command reconciles the counters
+        self.assertFalse(Project.objects.annotate(n=Count('likes')).exclude(like_count=F('n')).exists())
+
+        out = StringIO()
+        call_command('bench_views', iterations=2, latency=0, json=True, stdout=out)
+        results = {r['view']: r for r in json.loads(out.getvalue())}
+        self.assertEqual(
+            set(results), {'home', 'home_feed', 'project_detail', 'profile', 'manage_requests', 'search'},
+        )
+        self.assertGreater(results['home']['queries'], 0)
+
+    def test_benchmark_skips_views_the_data_cannot_drive(self):
+        call_command('seed_bench', size='0', stdout=StringIO())
+        out = StringIO()
+        call_command('bench_views', iterations=1, latency=0, json=True, stdout=out)
+        self.assertEqual(
+            {r['view'] for r in json.loads(out.getvalue())}, {'home', 'profile', 'manage_requests', 'search'},
+        )
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner')
+        self.project = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/a')
+        self.client.force_login(self.owner)
+
+    def server_timing(self, response):
+        entries = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            entries.setdefault(name, []).append(dict(param.split('=', 1) for param in params))
+        return entries
+
+    def test_server_timing_reports_sql_cache_and_templates(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('home'))
+        timing = self.server_timing(response)
+        self.assertEqual(timing['db'][0]['desc'], f'"{len(captured.captured_queries)} queries"')
+        self.assertEqual(timing['cache-project_card'][0]['desc'], '"0/1 hits"')
+        self.assertGreater(float(timing['template'][0]['dur']), 0)
+
+        timing = self.server_timing(self.client.get(reverse('home')))
+        self.assertEqual(timing['cache-home_projects'][0]['desc'], '"1/1 hits"')
+
+    def test_outbound_calls_from_worker_threads_count_toward_the_request(self):
+        timings = metrics.Timings()
+        token = metrics._current.set(timings)
+        try:
+            with github_stub.GitHubStub() as stub, \
+                    override_settings(GITHUB_API_URL=stub.api_url, GITHUB_RAW_URL=stub.raw_url):
+                cache.clear()
+                github.readme_gists(['octo', 'cat'])
+        finally:
+            metrics._current.reset(token)
+        host = stub.api_url.split('/')[2]
+        self.assertEqual(timings.hosts[host][0], 2)
+        self.assertGreater(timings.seconds['http'], 0)
+        self.assertEqual(timings.caches['readme_gist'], {'miss': 2})
+
+    def test_metrics_endpoint_exposes_histograms(self):
+        self.client.get(reverse('project_detail', args=[self.project.id]))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = response.content.decode().splitlines()
+        self.assertIn('# TYPE gitcollab_request_seconds histogram', lines)
+        self.assertTrue(any(
+            line.startswith('gitcollab_request_phase_seconds_count{view="project_detail",phase="sql"}')
+            for line in lines
+        ))
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('t', 'Test.', ('view',), buckets=(1, 5))
+        for value in (0.5, 3, 4, 9):
+            histogram.observe(('a"b',), value)
+        self.assertEqual(histogram.expose()[2:], [
+            't_bucket{view="a\\"b",le="1"} 1',
+            't_bucket{view="a\\"b",le="5"} 3',
+            't_bucket{view="a\\"b",le="+Inf"} 4',
+            't_sum{view="a\\"b"} 16.500000',
+            't_count{view="a\\"b"} 4',
+        ])
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        project = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/a')
+        ContributorRequest.objects.create(project=project, requester=User.objects.create_user('alice'))
+
+    async def test_slow_github_does_not_hold_up_other_requests(self):
+        await self.async_client.aforce_login(self.owner)
+        finished = []
+
+        async def get(name):
+            response = await self.async_client.get(reverse(name))
+            finished.append(name)
+            return response
+
+        with github_stub.GitHubStub(latency=0.5) as stub, \
+                override_settings(GITHUB_API_URL=stub.api_url, GITHUB_RAW_URL=stub.raw_url):
+            slow, fast = await asyncio.gather(get('manage_requests'), get('profile'))
+        self.assertEqual(finished, ['profile', 'manage_requests'])
+        self.assertContains(slow, 'README: # alice')
+        self.assertEqual(fast.status_code, 200)
+        self.assertNotIn('db;dur=0.0;desc="0 queries"', slow['Server-Timing'])
+
+    def test_sessions_from_the_old_backend_stay_logged_in(self):
+        migration = importlib.import_module('core.migrations.0021_rename_session_auth_backend')
+        session = SessionStore()
+        session.update({
+            SESSION_KEY: str(self.owner.pk),
+            BACKEND_SESSION_KEY: migration.OLD,
+            HASH_SESSION_KEY: self.owner.get_session_auth_hash(),
+        })
+        session.create()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 302)  # logged out
+
+        migration.rename(migration.OLD, migration.NEW)(apps, None)
+        self.assertEqual(self.client.get(reverse('profile')).status_code, 200)
+
+    def test_readme_import(self):
+        self.client.force_login(self.owner)
+        with github_stub.GitHubStub() as stub, \
+                override_settings(GITHUB_API_URL=stub.api_url, GITHUB_RAW_URL=stub.raw_url):
+            response = self.client.post(reverse('profile'), {'import_readme': '1'})
+        self.assertRedirects(response, reverse('profile'))
+        self.assertTrue(Profile.objects.get(user=self.owner).readme.startswith('# owner'))
+
+    def test_profile_query_count_does_not_grow_with_skills(self):
+        self.client.force_login(self.owner)
+        profile = Profile.objects.create(user=self.owner)
+        profile.skills.add(Skill.objects.create(name='Go'))
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('profile'))
+        profile.skills.add(*Skill.objects.bulk_create([Skill(name=f'skill{i}') for i in range(10)]))
+        with self.assertNumQueries(len(few.captured_queries)):
+            response = self.client.get(reverse('profile'))
+        self.assertContains(response, 'skill9')
+
+
+class AvatarProxyTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('viewer'))
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.stub = github_stub.GitHubStub().start()
+        self.addCleanup(self.stub.stop)
+        self.settings = override_settings(AVATAR_CACHE_DIR=cache_dir.name, GITHUB_AVATAR_URL=self.stub.web_url)
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+
+    def test_fetched_once_then_served_from_disk_with_validators(self):
+        response = self.client.get('/avatar/octo/40')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('immutable', response['Cache-Control'])
+        etag = response['ETag']
+
+        again = self.client.get('/avatar/octo/40')
+        self.assertEqual(again.content, response.content)
+        self.assertEqual(self.client.get('/avatar/octo/40', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.stub.counts['avatar'], 1)
+
+    def test_only_known_sizes_and_users(self):
+        self.assertEqual(self.client.get('/avatar/octo/41').status_code, 404)
+        self.assertEqual(self.client.get('/avatar/-octo/40').status_code, 404)
+        with override_settings(GITHUB_AVATAR_URL=self.stub.api_url):  # 404s every avatar
+            self.assertEqual(self.client.get('/avatar/ghost/40').status_code, 404)
+
+    def test_expired_avatar_is_served_stale_when_github_is_down(self):
+        first = self.client.get('/avatar/octo/40')
+        path = avatars._path('octo', 40, avatars._encodings()[-1])
+        old = time.time() - 2 * 24 * 3600
+        os.utime(path, (old, old))
+        with override_settings(GITHUB_AVATAR_URL='http://127.0.0.1:9'), self.assertLogs('core.avatars', 'WARNING'):
+            response = self.client.get('/avatar/octo/40')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, first.content)
+
+    def test_least_recently_served_are_evicted(self):
+        size = len(self.client.get('/avatar/alice/40').content)
+        old = time.time() - 3600
+        os.utime(avatars._path('alice', 40, avatars._encodings()[-1]), (old, old))
+        with override_settings(AVATAR_CACHE_MAX_BYTES=size * len(avatars._encodings()) * 3 // 2):
+            self.client.get('/avatar/bob/40')
+        self.assertEqual(os.listdir(settings.AVATAR_CACHE_DIR), [
+            os.path.basename(avatars._path('bob', 40, extension)) for extension in avatars._encodings()
+        ])
+
+    def test_hits_are_read_inline_not_on_the_fetch_pool(self):
+        self.client.get('/avatar/octo/40')
+        with mock.patch.object(avatars._executor, 'submit', side_effect=AssertionError('submitted')):
+            self.assertEqual(self.client.get('/avatar/octo/40').status_code, 200)
+
+    def test_file_evicted_after_the_check_is_a_miss(self):
+        self.client.get('/avatar/octo/40')
+        with mock.patch.object(avatars, '_read', side_effect=FileNotFoundError):
+            response = self.client.get('/avatar/octo/40')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stub.counts['avatar'], 2)
+
+    def test_images_pillow_cannot_decode_are_served_as_sent(self):
+        image = mock.Mock(DecompressionBombError=type('DecompressionBombError', (Exception,), {}))
+        image.open.side_effect = OSError('cannot identify image file')
+        with mock.patch.object(avatars, 'Image', image), \
+                mock.patch.object(avatars, 'features', mock.Mock(check=lambda name: False)), \
+                self.assertLogs('core.avatars', 'WARNING'):
+            response = self.client.get('/avatar/octo/40')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+
+    def test_directory_is_only_listed_when_it_may_be_over_the_cap(self):
+        with mock.patch.object(avatars, '_evict', wraps=avatars._evict) as evict:
+            for username in ('alice', 'bob', 'carol'):
+                self.client.get(f'/avatar/{username}/40')
+        # Once to learn the size of the directory, then counted as it grows
+        self.assertEqual(evict.call_count, 1)
+
+    def test_templates_link_the_nearest_stored_size(self):
+        self.assertEqual(avatars.avatar_url('Octo', 42), '/avatar/octo/48')
+        self.assertEqual(avatars.avatar_url('octo', 1000), '/avatar/octo/420')
+        self.assertContains(self.client.get(reverse('profile')), 'src="/avatar/viewer/210"')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        self.project = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/a')
+        self.viewer = User.objects.create_user('viewer')
+        self.client.force_login(self.viewer)
+        self.url = reverse('project_detail', args=[self.project.id])
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_get_a_304_without_running_the_view(self):
+        self.client.get(reverse('home'))  # creates the viewer's profile
+        for url in (reverse('home'), self.url):
+            response = self.client.get(url)
+            self.assertEqual(response['Cache-Control'], 'private, no-cache')
+            with CaptureQueriesContext(connection) as captured:
+                again = self.revalidate(url, response['ETag'])
+            self.assertEqual(again.status_code, 304)
+            # Besides the session and user, only the validator's read of the tag versions
+            validator = [
+                query['sql'] for query in captured.captured_queries
+                if 'django_session' not in query['sql'] and 'auth_user' not in query['sql']
+            ]
+            self.assertEqual(len(validator), 1)
+            self.assertIn(CacheTag._meta.db_table, validator[0])
+
+    def test_changes_shown_on_the_page_change_the_etag(self):
+        home, project = reverse('home'), self.url
+        changes = [
+            (lambda: self.project.likes.add(self.owner), (home, project)),
+            (lambda: Comment.objects.create(project=self.project, user=self.owner, text='hi'), (home, project)),
+            (lambda: ContributorRequest.objects.create(project=self.project, requester=self.owner), (home, project)),
+            # Project cards on the home page show the owner's payment links
+            (lambda: Profile.objects.create(user=self.owner, paypal='https://paypal.me/owner'), (home,)),
+            (lambda: Project.objects.filter(pk=self.project.pk).first().save(), (home, project)),
+        ]
+        for change, urls in changes:
+            etags = {url: self.client.get(url)['ETag'] for url in urls}
+            change()
+            for url, etag in etags.items():
+                self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_changes_made_by_other_processes_change_the_etag(self):
+        RepoSnapshot.objects.create(project=self.project, forks_count=1)
+        etags = {url: self.client.get(url)['ETag'] for url in (reverse('home'), self.url)}
+        # What sync_github does, from a process with a cache of its own
+        with mock.patch.object(cache_tags, 'cache', LocMemCache('other-process', {})):
+            RepoSnapshot.objects.filter(project=self.project).update(forks_count=2)
+            cache_tags.invalidate(cache_tags.project_tag(self.project.id))
+        for url, etag in etags.items():
+            self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_other_projects_do_not_change_the_project_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        other = Project.objects.create(owner=self.viewer, repo_link='https://github.com/viewer/b')
+        other.likes.add(self.owner)
+        self.assertEqual(self.revalidate(self.url, etag).status_code, 304)
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_login(self.owner)
+        self.assertEqual(self.revalidate(self.url, etag).status_code, 200)
+
+    def test_pending_messages_are_rendered(self):
+        ContributorRequest.objects.create(project=self.project, requester=self.viewer)
+        etag = self.client.get(self.url)['ETag']
+        # Asking again changes nothing but queues a message
+        self.client.post(self.url, {'request_join': '1'})
+        response = self.revalidate(self.url, etag)
+        self.assertContains(response, 'You have already requested to join this project')
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner')
+        self.viewer = User.objects.create_user('viewer')
+        self.python = Skill.objects.create(name='Python')
+        self.projects = [
+            Project.objects.create(owner=self.owner, repo_link=f'https://github.com/owner/{name}', description=name)
+            for name in ('a', 'b', 'c')
+        ]
+        self.projects[0].desired_skills.add(self.python)
+        RepoSnapshot.objects.create(project=self.projects[0], forks_count=7, readme_html='<p>big</p>')
+        self.client.force_login(self.viewer)
+
+    def get(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def sync_token(self, name):
+        return self.get(name, limit=1)['sync_token']
+
+    def test_pages_through_projects(self):
+        first = self.get('api_projects', limit=2)
+        self.assertEqual([p['id'] for p in first['data']], [p.id for p in self.projects[:2]])
+        self.assertEqual(first['data'][0]['forks_count'], 7)
+        self.assertEqual(first['data'][0]['desired_skills'], [self.python.id])
+        self.assertNotIn('readme_html', first['data'][0])
+        self.assertIsNone(first['data'][1]['forks_count'])
+
+        second = self.get('api_projects', limit=2, cursor=first['next_cursor'])
+        self.assertEqual([p['id'] for p in second['data']], [self.projects[2].id])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_sparse_fieldsets_load_only_what_they_need(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get('api_projects', fields='like_count,description')['data']
+        self.assertEqual(data[0], {'id': self.projects[0].id, 'like_count': 0, 'description': 'a'})
+        # No owner join, snapshot join or skills prefetch
+        project_queries = [q['sql'] for q in queries.captured_queries if 'core_project' in q['sql']]
+        self.assertEqual(len(project_queries), 1)
+        self.assertNotIn('JOIN', project_queries[0])
+
+        data = self.get('api_projects', fields='readme_html')['data']
+        self.assertEqual(data[0], {'id': self.projects[0].id, 'readme_html': '<p>big</p>'})
+
+    def test_bad_parameters(self):
+        for params in ({'fields': 'id,secret'}, {'cursor': 'nope'}, {'changes_since': 'nope'}, {'limit': 'x'},
+                       {'changes_since': pagination.encode_token('id', 1)}):
+            response = self.client.get(reverse('api_projects'), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_requires_login_and_is_read_only(self):
+        self.assertEqual(self.client.post(reverse('api_skills')).status_code, 405)
+        self.client.logout()
+        response = self.client.get(reverse('api_skills'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'error': 'Authentication required'})
+
+    def test_changes_since(self):
+        token = self.sync_token('api_projects')
+        empty = self.get('api_projects', changes_since=token)
+        self.assertEqual((empty['data'], empty['deleted'], empty['sync_token']), ([], [], token))
+
+        a, b, c = self.projects
+        new = Project.objects.create(owner=self.owner, repo_link='https://github.com/owner/d')
+        b.likes.add(self.viewer)
+        Project.objects.filter(pk=b.pk).update(like_count=F('like_count') + 0)  # no-op writes are not changes
+        c.desired_skills.add(self.python)
+        deleted_id = a.id
+        a.delete()
+
+        delta = self.get('api_projects', changes_since=token, fields='like_count,desired_skills')
+        self.assertEqual(delta['data'], [
+            {'id': new.id, 'like_count': 0, 'desired_skills': []},
+            {'id': b.id, 'like_count': 1, 'desired_skills': []},
+            {'id': c.id, 'like_count': 0, 'desired_skills': [self.python.id]},
+        ])
+        self.assertEqual(delta['deleted'], [deleted_id])
+        self.assertFalse(delta['has_more'])
+
+        # Syncing again from the new token only returns later writes
+        RepoSnapshot.objects.create(project=b, forks_count=3)
+        again = self.get('api_projects', changes_since=delta['sync_token'], fields='forks_count')
+        self.assertEqual(again['data'], [{'id': b.id, 'forks_count': 3}])
+        self.assertEqual(again['deleted'], [])
+
+    def test_changes_since_is_paginated(self):
+        token = self.sync_token('api_skills')
+        skills = [Skill.objects.create(name=name) for name in ('Go', 'Rust', 'C')]
+        first = self.get('api_skills', changes_since=token, limit=2)
+        self.assertTrue(first['has_more'])
+        second = self.get('api_skills', changes_since=first['sync_token'], limit=2)
+        self.assertFalse(second['has_more'])
+        self.assertEqual([s['name'] for s in first['data'] + second['data']], [s.name for s in skills])
+
+        deleted_id = skills[0].id
+        skills[0].delete()
+        delta = self.get('api_skills', changes_since=second['sync_token'])
+        self.assertEqual((delta['data'], delta['deleted']), ([], [deleted_id]))
+
+    def test_requests_are_the_callers_own(self):
+        mine = ContributorRequest.objects.create(project=self.projects[0], requester=self.viewer)
+        ContributorRequest.objects.create(project=self.projects[0], requester=self.owner)
+        listing = self.get('api_requests')
+        self.assertEqual(listing['data'], [{
+            'id': mine.id, 'project': self.projects[0].id, 'status': 'pending', 'created_at': mine.created_at.isoformat(),
+        }])
+
+        token = listing['sync_token']
+        other = ContributorRequest.objects.create(project=self.projects[1], requester=self.owner)
+        other.delete()
+        mine.status = 'accepted'
+        mine.save()
+        delta = self.get('api_requests', changes_since=token, fields='status')
+        self.assertEqual(delta['data'], [{'id': mine.id, 'status': 'accepted'}])
+        self.assertEqual(delta['deleted'], [])
+
+        self.projects[0].delete()
+        self.assertEqual(self.get('api_requests', changes_since=delta['sync_token'])['deleted'], [mine.id])
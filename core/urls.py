@@ -1,12 +1,22 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('home/', views.home, name='home'),
+    path('home/feed/', views.home_feed, name='home_feed'),
     path('', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('search/', views.search_projects, name='search'),
     path('create/', views.create_project, name='create_project'),
     path('project/<int:project_id>/', views.project_detail, name='project_detail'),
+    path('project/<int:project_id>/comments/', views.project_comments, name='project_comments'),
+    path('project/<int:project_id>/like', views.toggle_like, name='toggle_like'),
     path('profile/', views.profile_view, name='profile'),
     path('requests/', views.manage_requests, name='manage_requests'),
+    path('requests/bulk/', views.bulk_manage_requests, name='bulk_manage_requests'),
+    path('avatar/<str:username>/<int:size>', views.avatar, name='avatar'),
+    path('metrics', views.metrics_view, name='metrics'),
+    path('api/v1/projects', api.projects, name='api_projects'),
+    path('api/v1/skills', api.skills, name='api_skills'),
+    path('api/v1/requests', api.contributor_requests, name='api_requests'),
 ]
\ No newline at end of file
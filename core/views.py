@@ -1,17 +1,26 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
 from django.contrib.auth import logout as auth_logout
 from django.contrib.auth.decorators import login_required
-from django.http import Http404, JsonResponse
-from .models import Project, Comment, ContributorRequest, User, Profile, Skill
-import markdown
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse
 import requests
+import json
+from collections import Counter
+from .models import Project, Comment, ContributorRequest, Job, Profile, Skill
 from social_django.models import UserSocialAuth
 from django.contrib import messages
 from django.conf import settings
-from django.db.models import Min
-from django.utils.html import mark_safe
-from django.core.cache import cache
-from django.utils import timezone
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch
+from django.db.models.functions import Greatest
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from . import github
+from . import avatars, cache_tags, counters, etags, feed, jobs, metrics, search
+from .markdown_cache import render_markdown
+from .pagination import InvalidCursor, keyset_page
 
 def login_view(request):
     if request.user.is_authenticated:
@@ -24,91 +33,67 @@ def logout_view(request):
     return redirect('login')
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.home)
 def home(request):
     user_profile, created = Profile.objects.get_or_create(user=request.user)
-    
-    # Cache key for projects (daily refresh)
-    cache_key_projects = f'home_projects_{timezone.now().date()}'
-    projects = cache.get(cache_key_projects)
-    if not projects:
-        projects = Project.objects.all().order_by('-created_at')
-        project_requests = {}
-        
-        for project in projects:
-            # Cache key for project requests
-            cache_key_requests = f'project_requests_{project.id}'
-            requests_data = cache.get(cache_key_requests)
-            if not requests_data:
-                requests_qs = (
-                    ContributorRequest.objects
-                    .filter(project=project, status='pending')
-                    .values('requester')
-                    .annotate(min_id=Min('id'))[:5]
-                )
-                request_user_info = []
-                for req in requests_qs:
-                    user = User.objects.get(id=req['requester'])
-                    avatar_url = f"https://github.com/{user.username}.png"
-                    request_user_info.append({
-                        'username': user.username,
-                        'avatar': avatar_url,
-                    })
-                project_requests[project.id] = request_user_info
-                cache.set(cache_key_requests, request_user_info, 3600)  # Cache for 1 hour
-            else:
-                project_requests[project.id] = requests_data
-
-            # Cache GitHub API data
-            cache_key_github = f'github_data_{project.repo_link}'
-            github_data = cache.get(cache_key_github)
-            if not github_data:
-                github_data = {}
-                if project.repo_link and 'github.com' in project.repo_link:
-                    try:
-                        owner_repo = project.repo_link.split("github.com/")[1].replace('.git', '')
-                        api_url = f"https://api.github.com/repos/{owner_repo}"
-                        response = requests.get(api_url, timeout=5)
-                        if response.status_code == 200:
-                            data = response.json()
-                            github_data['forks_count'] = data.get("forks_count", 0)
-                    except Exception:
-                        github_data['forks_count'] = None
-
-                    try:
-                        readme_url = f"https://raw.githubusercontent.com/{owner_repo}/main/README.md"
-                        readme_response = requests.get(readme_url, timeout=5)
-                        if readme_response.status_code == 200:
-                            readme_content = readme_response.text
-                            github_data['readme_html'] = mark_safe(markdown.markdown(readme_content))
-                    except Exception:
-                        github_data['readme_html'] = None
-                cache.set(cache_key_github, github_data, 3600)  # Cache for 1 hour
-            project.forks_count = github_data.get('forks_count')
-            project.readme_html = github_data.get('readme_html')
-
-            # Payment URLs (cached with profile data if needed)
-            profile = Profile.objects.filter(user=project.owner).first()
-            project.buy_me_a_coffee = profile.buy_me_a_coffee if profile and project.buy_me_a_coffee else None
-            project.patreon = profile.patreon if profile and project.patreon else None
-            project.paypal = profile.paypal if profile and project.paypal else None
-
-        cache.set(cache_key_projects, projects, 3600)  # Cache for 1 hour
-    else:
-        project_requests = {p.id: cache.get(f'project_requests_{p.id}') for p in projects}
 
-    # Cache skill matching
-    cache_key_matched = f'matched_projects_{request.user.id}'
-    matched_projects = cache.get(cache_key_matched)
-    if not matched_projects:
-        user_profile = Profile.objects.get(user=request.user)
-        user_skills = user_profile.skills.values_list('name', flat=True)
-        matched_projects = [p for p in projects if any(skill in user_skills for skill in p.desired_skills.values_list('name', flat=True))]
-        cache.set(cache_key_matched, matched_projects, 3600)  # Cache for 1 hour
+    page = feed.feed_page()
+    matched_projects, matched_requests = feed.matched_projects(request.user)
+    cards = page['projects'] + matched_projects
+    feed.render_cards(cards, {**page['project_requests'], **matched_requests})
 
     return render(request, 'home.html', {
-        'projects': projects,
-        'project_requests': project_requests,
-        'matched_projects': matched_projects
+        'projects': page['projects'],
+        'matched_projects': matched_projects,
+        'liked_project_ids': feed.liked_ids(request.user, cards),
+        'next_cursor': page['next_cursor'],
+    })
+
+@login_required
+def home_feed(request):
+    """Next page of the home feed for infinite scroll, as JSON or (``?format=html``) card HTML."""
+    Profile.objects.get_or_create(user=request.user)
+    try:
+        page = feed.feed_page(request.GET.get('cursor'))
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if request.GET.get('format') == 'html':
+        matched_projects, _ = feed.matched_projects(request.user)
+        feed.render_cards(page['projects'], page['project_requests'])
+        response = render(request, 'home_feed.html', {
+            'projects': page['projects'],
+            'matched_projects': matched_projects,
+            'liked_project_ids': feed.liked_ids(request.user, page['projects']),
+        })
+        if page['next_cursor']:
+            response['X-Next-Cursor'] = page['next_cursor']
+        return response
+
+    return JsonResponse({
+        'projects': [feed.project_json(p, page['project_requests']) for p in page['projects']],
+        'next_cursor': page['next_cursor'],
+    })
+
+@login_required
+def search_projects(request):
+    """Full-text project search, best match first (see core.search)."""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 1
+    # Clamped, so a huge page number can't overflow SQLite's OFFSET
+    page = min(max(page, 1), settings.SEARCH_MAX_PAGE)
+    page_size = settings.SEARCH_PAGE_SIZE
+    # One row past the page tells us whether there is a next one
+    hits = search.search(query, limit=page_size + 1, offset=(page - 1) * page_size)
+    projects = Project.objects.select_related('owner').in_bulk([project_id for project_id, _ in hits[:page_size]])
+    return render(request, 'search.html', {
+        'query': query,
+        'results': [(projects[project_id], snippet) for project_id, snippet in hits[:page_size] if project_id in projects],
+        'next_page': page + 1 if len(hits) > page_size and page < settings.SEARCH_MAX_PAGE else None,
     })
 
 @login_required
@@ -154,39 +139,31 @@ import logging
 logger = logging.getLogger(__name__)
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=etags.project)
 def project_detail(request, project_id):
-    project = get_object_or_404(Project, id=project_id)
+    # like_count is a column, and whether this user liked it is one EXISTS
+    project = get_object_or_404(
+        Project.objects.annotate(liked_by_me=Exists(
+            counters.Like.objects.filter(project=OuterRef('pk'), user_id=request.user.id)
+        )),
+        id=project_id,
+    )
 
     if request.method == 'POST':
-        # Handle AJAX like request
-        if 'like' in request.POST and request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            if project.likes.filter(id=request.user.id).exists():
-                project.likes.remove(request.user)
-                liked = False
-            else:
-                project.likes.add(request.user)
-                liked = True
-            return JsonResponse({
-                'liked': liked,
-                'like_count': project.likes.count()
-            })
-        # Handle non-AJAX like request (fallback)
-        elif 'like' in request.POST:
-            if project.likes.filter(id=request.user.id).exists():
-                project.likes.remove(request.user)
-            else:
-                project.likes.add(request.user)
-            return redirect('project_detail', project_id=project_id)
+        # Likes are toggled by toggle_like; this keeps old forms working
+        if 'like' in request.POST:
+            return toggle_like(request, project_id)
         # Handle comment submission
-        elif 'comment' in request.POST:
+        if 'comment' in request.POST:
             Comment.objects.create(project=project, user=request.user, text=request.POST['comment'])
             messages.success(request, 'Comment added successfully.')
             return redirect('project_detail', project_id=project_id)
         # Handle join request
         elif 'request_join' in request.POST:
-            # Check if request already exists to prevent duplicates
-            if not ContributorRequest.objects.filter(project=project, requester=request.user).exists():
-                ContributorRequest.objects.create(project=project, requester=request.user)
+            # The unique constraint settles concurrent duplicates
+            _, created = ContributorRequest.objects.get_or_create(project=project, requester=request.user)
+            if created:
                 messages.success(request, 'Request Sent')
             else:
                 messages.info(request, 'You have already requested to join this project')
@@ -202,28 +179,63 @@ def project_detail(request, project_id):
                 messages.error(request, 'You are not allowed to delete this comment.')
             return redirect('project_detail', project_id=project_id)
 
-    return render(request, 'project_detail.html', {'project': project})
+    comments, next_cursor = _comment_page(project, None)
+    return render(request, 'project_detail.html', {
+        'project': project,
+        'comments': comments,
+        'next_cursor': next_cursor,
+    })
+
+def _comment_page(project, cursor):
+    """
+    One keyset-paginated page of ``project``'s comments, with their authors.
+
+    Pages run newest first, so the project page shows the latest comments,
+    including one just posted, and "load earlier" walks back from there.
+    Each page is in reading order, oldest first.
+    """
+    comments, next_cursor = keyset_page(
+        Comment.objects.filter(project=project).select_related('user'),
+        cursor, settings.COMMENTS_PAGE_SIZE, descending=True,
+    )
+    return comments[::-1], next_cursor
 
 @login_required
-def profile_view(request):
+def project_comments(request, project_id):
+    """Earlier page of a project's comments as HTML for "load earlier", with ``X-Next-Cursor``."""
+    project = get_object_or_404(Project.objects.only('id'), id=project_id)
+    try:
+        comments, next_cursor = _comment_page(project, request.GET.get('cursor'))
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    response = render(request, 'comment_list.html', {'project': project, 'comments': comments})
+    if next_cursor:
+        response['X-Next-Cursor'] = next_cursor
+    return response
+
+@login_required
+async def profile_view(request):
+    # Async, so waiting on GitHub for a README import doesn't hold a worker.
+    # Everything the template reads is loaded here; it must not query.
+    request.user = await request.auser()
     # Get or create the user's profile
-    profile, created = Profile.objects.get_or_create(user=request.user)
+    profile, created = await Profile.objects.aget_or_create(user=request.user)
     
     if request.method == 'POST':
         if 'import_readme' in request.POST:
             # Manual README import requested
             github_username = request.user.username
-            readme_url = f"https://raw.githubusercontent.com/{github_username}/{github_username}/main/README.md"
+            readme_url = github.raw_url(f"{github_username}/{github_username}/main/README.md")
             try:
-                readme_response = requests.get(readme_url, timeout=5)
+                readme_response = await github.run_async(github.client.get, readme_url)
                 if readme_response.status_code == 200:
                     profile.readme = readme_response.text
-                    profile.save()
+                    await profile.asave()
                     messages.success(request, 'README imported successfully.')
                 else:
                     messages.error(request, f'Could not find a README for your GitHub profile (Status: {readme_response.status_code}).')
-            except requests.RequestException as e:
-                messages.error(request, f'Error connecting to GitHub: {str(e)}')
+            except github.GitHubError as e:
+                messages.error(request, str(e))
             return redirect('profile')
         else:
             # Normal profile update
@@ -243,42 +255,42 @@ def profile_view(request):
             profile.access_token = access_token
             
             # Handle skill updates
-            current_skills = set(profile.skills.values_list('name', flat=True))
+            current_skills = {name async for name in profile.skills.values_list('name', flat=True)}
             selected_skills = request.POST.getlist('skills')  # Get selected skill names
             new_skills = set(selected_skills) - current_skills
             removed_skills = current_skills - set(selected_skills)
 
             # Add new skills
             for skill_name in new_skills:
-                skill, created = Skill.objects.get_or_create(name=skill_name)
-                profile.skills.add(skill)
+                skill, created = await Skill.objects.aget_or_create(name=skill_name)
+                await profile.skills.aadd(skill)
 
             # Remove skills
             for skill_name in removed_skills:
-                skill = Skill.objects.get(name=skill_name)
-                profile.skills.remove(skill)
+                skill = await Skill.objects.aget(name=skill_name)
+                await profile.skills.aremove(skill)
 
-            profile.save()
+            await profile.asave()
             messages.success(request, 'Profile updated successfully.')
             return redirect('profile')
 
     # Fetch GitHub data
     github_username = request.user.username
-    github_avatar = f"https://github.com/{github_username}.png"
     
     # Calculate reputation
     reputation = profile.reputation_score()
     
     # Convert README from markdown to HTML
-    readme_html = markdown.markdown(profile.readme) if profile.readme else ""
+    readme_html = (await sync_to_async(render_markdown)(profile.readme)).html if profile.readme else ""
     
     # Get all available skills for the dropdown
-    all_skills = Skill.objects.all()
+    all_skills = [skill async for skill in Skill.objects.all()]
+    profile_skills = [skill async for skill in profile.skills.all()]
     
     context = {
         'profile': profile,
+        'profile_skills': profile_skills,
         'github_username': github_username,
-        'github_avatar': github_avatar,
         'reputation': reputation,
         'readme_html': readme_html,
         'is_new_user': created,
@@ -286,113 +298,210 @@ def profile_view(request):
     }
     return render(request, 'profile.html', context)
 
-@login_required
-def manage_requests(request):
-    # Get projects owned by the current user
-    projects = Project.objects.filter(owner=request.user)
-    if not projects.exists():
-        return render(request, 'manage_requests.html', {'message': 'You have no projects with contributor requests.'})
-    
-    # Fetch pending contributor requests for the user's projects
-    raw_requests = ContributorRequest.objects.filter(project__in=projects, status='pending')
+def github_auth_prefetch(user_path):
+    """Prefetch the GitHub social auth row of the user at ``user_path`` into ``github_auth``."""
+    return Prefetch(
+        f'{user_path}__social_auth',
+        queryset=UserSocialAuth.objects.filter(provider='github'),
+        to_attr='github_auth',
+    )
+
+def github_login(user):
+    """GitHub login of ``user`` from social auth data (prefetched when possible), or None."""
+    if hasattr(user, 'github_auth'):
+        social = user.github_auth[0] if user.github_auth else None
+    else:
+        social = UserSocialAuth.objects.filter(user=user, provider='github').first()
+    return social.extra_data.get('login') if social else None
+
+def _contributor_requests(projects):
+    """
+    Pending requests for ``projects`` with the requester details the page shows.
+
+    ``readme_gist`` is None for requesters whose summary has to come from GitHub.
+    """
+    raw_requests = list(
+        ContributorRequest.objects
+        .filter(project__in=projects, status='pending')
+        .select_related('project', 'requester__profile')
+        .prefetch_related(github_auth_prefetch('requester'))
+    )
 
     contributor_requests = []
     for req in raw_requests:
-        try:
-            social = UserSocialAuth.objects.get(user=req.requester, provider='github')
-            github_username = social.extra_data.get('login')
-            avatar_url = f"https://github.com/{github_username}.png"
-        except UserSocialAuth.DoesNotExist:
-            github_username = req.requester.username
-            avatar_url = None
+        github_username = github_login(req.requester) or req.requester.username
 
+        # Requesters who imported their README into their profile need no call
+        profile = getattr(req.requester, 'profile', None)
         contributor_requests.append({
             'id': req.id,
             'requester': req.requester,
             'project': req.project,
             'github_username': github_username,
-            'avatar_url': avatar_url,
+            'readme_gist': profile.readme[:200] if profile and profile.readme else None,
         })
+    return contributor_requests
+
+def _accept_request(req, requester_username):
+    """Mark ``req`` accepted and queue its collaborator invite, atomically."""
+    with transaction.atomic():
+        req.status = 'accepted'
+        req.save()
+        Project.objects.filter(id=req.project_id).update(
+            contributors_needed=Greatest(F('contributors_needed') - 1, 0)
+        )
+        return jobs.enqueue_invite(req, requester_username)
+
+@login_required
+@require_POST
+def toggle_like(request, project_id):
+    """Like or unlike a project; AJAX callers get ``{"liked", "like_count"}`` back."""
+    try:
+        liked, like_count = counters.toggle_like(project_id, request.user.id)
+    except Project.DoesNotExist:
+        raise Http404('No Project matches the given query.')
+    cache_tags.invalidate(cache_tags.project_tag(project_id))
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({'liked': liked, 'like_count': like_count})
+    return redirect('project_detail', project_id=project_id)
+
+@login_required
+async def avatar(request, username, size):
+    """A resized GitHub avatar from the disk cache (see core.avatars)."""
+    if size not in avatars.SIZES or not avatars.USERNAME.match(username):
+        raise Http404('No such avatar.')
+    webp = 'image/webp' in request.headers.get('Accept', '')
+    try:
+        # Hits are read inline; only misses wait on the avatar fetch pool
+        image = await avatars.aload(username, size, webp)
+    except avatars.AvatarNotFound:
+        raise Http404('No such GitHub user.')
+    except requests.RequestException:
+        return HttpResponse('Could not fetch the avatar from GitHub.', status=502)
+
+    response = get_conditional_response(request, etag=image.etag) or HttpResponse(
+        image.content, content_type=image.content_type,
+    )
+    response['ETag'] = image.etag
+    # The URL names no version, so immutability only lasts until the file is due a refresh
+    response['Cache-Control'] = f'public, max-age={settings.AVATAR_MAX_AGE}, immutable'
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for this process's request metrics."""
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
+@login_required
+async def manage_requests(request):
+    # Async, so the README summaries pending from GitHub don't hold a worker
+    request.user = await request.auser()
+    # Get projects owned by the current user
+    projects = Project.objects.filter(owner=request.user)
+    if not await projects.aexists():
+        return render(request, 'manage_requests.html', {'message': 'You have no projects with contributor requests.'})
+
+    context = {}
     if request.method == 'POST':
         req_id = request.POST['request_id']
         action = request.POST['action']
-        req = get_object_or_404(ContributorRequest, id=req_id)
+        req = await aget_object_or_404(ContributorRequest.objects.select_related('project', 'requester'), id=req_id)
 
         # Ensure the current user owns the project associated with the request
-        if req.project.owner != request.user:
+        if req.project.owner_id != request.user.id:
             raise Http404("You are not authorized to manage this request.")
 
         if action == 'accept':
-            req.status = 'accepted'
-            req.save()
-
-            project = req.project
-            if project.contributors_needed > 0:
-                project.contributors_needed -= 1
-            project.save()
-
             # Get GitHub username of requester
-            try:
-                requester_social = UserSocialAuth.objects.get(user=req.requester, provider='github')
-                requester_username = requester_social.extra_data.get('login')
-                if not requester_username:
-                    return render(request, 'manage_requests.html', {
-                        'requests': contributor_requests,
-                        'error': 'Requester GitHub username not found'
-                    })
-            except UserSocialAuth.DoesNotExist:
-                return render(request, 'manage_requests.html', {
-                    'requests': contributor_requests,
-                    'error': 'GitHub authentication data missing for requester'
-                })
-
-            # Extract repo owner and name from link
-            repo_parts = project.repo_link.rstrip('/').split('/')
-            repo_owner = repo_parts[-2]
-            repo_name = repo_parts[-1]
-
-            # Get the user's access token from their profile
-            try:
-                profile = Profile.objects.get(user=request.user)
-                access_token = profile.access_token
-                if not access_token:
-                    return render(request, 'manage_requests.html', {
-                        'requests': contributor_requests,
-                        'error': 'You have not set a GitHub access token in your profile.'
-                    })
-            except Profile.DoesNotExist:
-                return render(request, 'manage_requests.html', {
-                    'requests': contributor_requests,
-                    'error': 'Your profile is missing or incomplete.'
-                })
-
-            # GitHub API request to add collaborator
-            api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/collaborators/{requester_username}"
-            headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Accept": "application/vnd.github+json"
-            }
-
-            response = requests.put(api_url, headers=headers)
-
-            if response.status_code == 201:
-                message = f"Successfully invited {requester_username} as a collaborator."
-            elif response.status_code == 204:
-                message = f"{requester_username} is already a collaborator."
+            requester_username = await sync_to_async(github_login)(req.requester)
+            if not requester_username:
+                context['error'] = 'GitHub authentication data missing for requester'
             else:
-                return render(request, 'manage_requests.html', {
-                    'requests': contributor_requests,
-                    'error': f"GitHub API Error {response.status_code}: {response.json().get('message', 'Unknown error')}"
-                })
-
-            return render(request, 'manage_requests.html', {
-                'requests': contributor_requests,
-                'message': message
-            })
+                # The invite is sent by `manage.py run_jobs`, so a slow or
+                # failing GitHub never holds up this request
+                await sync_to_async(_accept_request)(req, requester_username)
+                context['message'] = f"Accepted. The collaborator invite for {requester_username} is queued."
+                profile = await Profile.objects.filter(user=request.user).afirst()
+                if not profile or not profile.access_token:
+                    context['message'] += ' It will be sent once you set a GitHub access token in your profile.'
 
         elif action == 'reject':
             req.status = 'rejected'
-            req.save()
+            await req.asave()
+
+    contributor_requests = await sync_to_async(_contributor_requests)(projects)
+    # The remaining README summaries are loaded here, concurrently and through
+    # the cache, rather than by a template filter making one blocking call per row
+    readme_gists = await github.areadme_gists(
+        {r['github_username'] for r in contributor_requests if r['readme_gist'] is None}
+    )
+    for r in contributor_requests:
+        if r['readme_gist'] is None:
+            r['readme_gist'] = readme_gists[r['github_username']]
+    context['requests'] = contributor_requests
+    context['invite_jobs'] = [
+        job async for job in Job.objects
+        .filter(contributor_request__project__owner=request.user)
+        .select_related('contributor_request__project', 'contributor_request__requester')
+        .order_by('-created_at')[:20]
+    ]
+    return render(request, 'manage_requests.html', context)
+
 
-    return render(request, 'manage_requests.html', {'requests': contributor_requests})
\ No newline at end of file
+@login_required
+@require_POST
+def bulk_manage_requests(request):
+    """
+    Accept or reject many contributor requests at once.
+
+    Expects a JSON body ``{"decisions": [{"request_id": 1, "action": "accept"}, ...]}``.
+    Status and ``contributors_needed`` changes are applied, and collaborator
+    invites queued, in one transaction. Returns one result per decision.
+    """
+    try:
+        decisions = json.loads(request.body)['decisions']
+        decisions = {int(d['request_id']): d['action'] for d in decisions}
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected {"decisions": [{"request_id": ..., "action": ...}]}'}, status=400)
+
+    results = {req_id: {'request_id': req_id, 'status': 'not_found'} for req_id in decisions}
+    with transaction.atomic():
+        pending = (
+            ContributorRequest.objects
+            .select_for_update()
+            .filter(id__in=decisions, project__owner=request.user, status='pending')
+            .select_related('project')
+            .prefetch_related(github_auth_prefetch('requester'))
+        )
+        accepted, rejected = [], []
+        for req in pending:
+            action = decisions[req.id]
+            requester_username = github_login(req.requester)
+            if action == 'accept' and not requester_username:
+                results[req.id]['status'] = 'error'
+                results[req.id]['error'] = 'GitHub authentication data missing for requester'
+            elif action == 'accept':
+                accepted.append((req, requester_username))
+            elif action == 'reject':
+                rejected.append(req)
+            else:
+                results[req.id]['status'] = 'invalid_action'
+
+        ContributorRequest.objects.filter(id__in=[r.id for r, _ in accepted]).update(status='accepted')
+        ContributorRequest.objects.filter(id__in=[r.id for r in rejected]).update(status='rejected')
+        for project_id, count in Counter(r.project_id for r, _ in accepted).items():
+            Project.objects.filter(id=project_id).update(
+                contributors_needed=Greatest(F('contributors_needed') - count, 0)
+            )
+        # Queryset updates send no signals, so drop the affected cards here
+        cache_tags.invalidate(*{cache_tags.project_tag(r.project_id) for r in pending})
+        for req, requester_username in accepted:
+            job = jobs.enqueue_invite(req, requester_username)
+            results[req.id].update({'status': 'accepted', 'invite': {'job_id': job.id, 'status': job.status}})
+    for req in rejected:
+        results[req.id]['status'] = 'rejected'
+
+    return JsonResponse({'results': list(results.values())})
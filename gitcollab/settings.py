@@ -33,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the whole request (see core.metrics)
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -46,7 +48,7 @@ ROOT_URLCONF = 'gitcollab.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metrics.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -65,10 +67,31 @@ WSGI_APPLICATION = 'gitcollab.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for concurrent writers (`manage.py bench_sqlite` compares it
+# with Django's defaults): WAL lets readers run alongside the one writer,
+# `timeout` is the busy timeout in seconds, and IMMEDIATE transactions take
+# the write lock up front instead of failing on a read-to-write upgrade.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Persistent connections pay off under WSGI, where a request's sync
+        # code, async views' ORM calls included, runs on the worker's own
+        # thread. Under ASGI each request gets a fresh thread and its
+        # connection would linger, so gitcollab.asgi sets this to 0.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'  # 128 MiB
+                'PRAGMA cache_size=-20000;'  # 20 MiB
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
     }
 }
 
@@ -116,7 +139,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 AUTHENTICATION_BACKENDS = (
-    'social_core.backends.github.GithubOAuth2',
+    'core.backends.GithubOAuth2',
     'django.contrib.auth.backends.ModelBackend',
 )
 
@@ -134,9 +157,74 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+# Each process has its own LocMem cache. That is safe for the tagged caches
+# because tag versions (core.cache_tags) live in the database, so a bump in
+# one worker or management command invalidates entries everywhere. Rebuild
+# locks and lookup stats stay per process unless this points at a shared
+# backend such as Redis or Memcached.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
     }
-}
\ No newline at end of file
+}
+
+# `manage.py sync_github` fetches repo snapshots concurrently; repos that miss
+# the per-batch deadline (seconds) are retried on the next pass.
+GITHUB_FETCH_WORKERS = 8
+GITHUB_FETCH_DEADLINE = 3
+
+# Shared GitHub client (core.github). GITHUB_TOKEN authenticates server-side
+# reads so they draw on the 5000/hour quota instead of 60/hour per IP.
+GITHUB_API_URL = 'https://api.github.com'
+GITHUB_RAW_URL = 'https://raw.githubusercontent.com'
+GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
+GITHUB_TIMEOUT = 5
+GITHUB_POOL_SIZE = 16
+# Switch to serving cached data once this many calls are left in the window
+GITHUB_RATE_LIMIT_RESERVE = 50
+# Fail fast for GITHUB_CIRCUIT_COOLDOWN seconds after this many consecutive errors
+GITHUB_CIRCUIT_THRESHOLD = 5
+GITHUB_CIRCUIT_COOLDOWN = 30
+
+# Projects per page of the home feed (keyset-paginated, see core.pagination)
+FEED_PAGE_SIZE = 20
+
+# Rendered Markdown (core.markdown_cache): rows kept in the shared table and
+# entries kept in each process's in-memory LRU
+MARKDOWN_CACHE_MAX_ENTRIES = 10000
+MARKDOWN_LOCAL_CACHE_SIZE = 256
+
+# Cached feed pages (core.cache_tags): past the soft TTL they are still served
+# while one background thread rebuilds them; past the hard TTL they are gone.
+# Edits invalidate them immediately either way.
+FEED_CACHE_SOFT_TTL = 3600
+FEED_CACHE_HARD_TTL = 24 * 3600
+
+# Comments per page on the project page; the rest load on demand
+COMMENTS_PAGE_SIZE = 20
+
+# Results per page of full-text project search (core.search), and the deepest
+# page served; later pages would only make SQLite rank and skip more rows
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE = 50
+
+# Rows per page of the JSON API (core.api) unless the client asks for fewer,
+# and the most it may ask for
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+# Per-request timings (core.metrics) go out in a Server-Timing header, which
+# any client can read; set SERVER_TIMING = False to keep them internal. When
+# METRICS_TOKEN is set, /metrics requires "Authorization: Bearer <token>".
+SERVER_TIMING = True
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+# Avatar proxy (core.avatars): resized GitHub avatars kept on disk, served as
+# immutable for AVATAR_MAX_AGE seconds and fetched again after that.
+GITHUB_AVATAR_URL = 'https://github.com'
+AVATAR_CACHE_DIR = BASE_DIR / 'avatar_cache'
+AVATAR_CACHE_MAX_BYTES = 100 * 1024 * 1024
+AVATAR_MAX_AGE = 24 * 3600
+# Threads fetching avatars from GitHub; files already on disk are read inline
+AVATAR_FETCH_WORKERS = 4